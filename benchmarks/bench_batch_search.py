@@ -0,0 +1,85 @@
+"""
+Batch search vs. looping over single queries.
+
+    python benchmarks/bench_batch_search.py [--chunks 20000] [--queries 2000] [--dim 1536]
+
+Uses random unit vectors in place of OpenAI embeddings so only the search and
+re-ranking cost is measured (a real run additionally saves one embedding
+request per query). Compares, for a FAISS store and a memory-mapped
+knowledge pack:
+  * loop:  one similarity_search_by_vector / max_marginal_relevance_search_by_vector per query
+  * batch: vector_search.batch_search over the whole query matrix
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.embeddings import FakeEmbeddings
+from langchain.vectorstores import FAISS
+
+from knowledge_pack import KnowledgePack, write_knowledge_pack
+import vector_search
+
+
+def unit_vectors(rng, count, dim):
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = unit_vectors(rng, args.chunks, args.dim)
+    queries = unit_vectors(rng, args.queries, args.dim)
+    texts = [f"chunk {i}" for i in range(args.chunks)]
+    # The store is built from the precomputed vectors; the embedding object is never asked for them
+    store = FAISS.from_embeddings(list(zip(texts, vectors.tolist())), FakeEmbeddings(size=args.dim))
+    pack_path = os.path.join(tempfile.mkdtemp(), "bench.kpack")
+    write_knowledge_pack(pack_path, vectors, texts)
+    pack = KnowledgePack(pack_path)
+    print(f"{args.chunks} chunks, {args.queries} queries, dim {args.dim}, k={args.k}, fetch_k={args.fetch_k}\n")
+    print(f"{'case':<30}{'loop q/s':>12}{'batch q/s':>12}{'speedup':>10}{'same top-k':>12}")
+
+    def report(name, loop_seconds, batch_seconds, loop_hits, batch_hits):
+        same = np.mean([[d.page_content for d in a] == [d.page_content for d in b] for a, b in zip(loop_hits, batch_hits)])
+        print(f"{name:<30}{args.queries / loop_seconds:>12.0f}{args.queries / batch_seconds:>12.0f}"
+              f"{loop_seconds / batch_seconds:>9.1f}x{same:>12.0%}")
+
+    loop_seconds, loop_hits = timed(lambda: [store.similarity_search_by_vector(q.tolist(), k=args.k) for q in queries])
+    batch_seconds, batch_hits = timed(lambda: vector_search.batch_search(store, None, ["q"] * args.queries, k=args.k, query_vectors=queries))
+    report("FAISS similarity", loop_seconds, batch_seconds, loop_hits, batch_hits)
+
+    loop_seconds, loop_hits = timed(lambda: [
+        store.max_marginal_relevance_search_by_vector(q.tolist(), k=args.k, fetch_k=args.fetch_k) for q in queries
+    ])
+    batch_seconds, batch_hits = timed(lambda: vector_search.batch_search(
+        store, None, ["q"] * args.queries, k=args.k, fetch_k=args.fetch_k, mmr=True, query_vectors=queries
+    ))
+    report("FAISS MMR", loop_seconds, batch_seconds, loop_hits, batch_hits)
+
+    loop_seconds, loop_hits = timed(lambda: [pack.search(q, k=args.k) for q in queries])
+    batch_seconds, batch_hits = timed(lambda: vector_search.batch_search(pack, None, ["q"] * args.queries, k=args.k, query_vectors=queries))
+    report("knowledge pack similarity", loop_seconds, batch_seconds, loop_hits, batch_hits)
+
+
+if __name__ == "__main__":
+    main()
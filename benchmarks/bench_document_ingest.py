@@ -0,0 +1,109 @@
+"""
+Extraction of in-memory uploads: thread pool vs. spill-to-disk + process pool.
+
+    python benchmarks/bench_document_ingest.py [--files 8] [--pages 40] [--workers N]
+
+Generates text PDFs in memory (as Streamlit hands uploads over, BytesIO) and
+extracts them with each strategy in a fresh interpreter, reporting wall time
+and the peak RSS of the parent and of the worker processes:
+  * serial:    one file after another in the calling process
+  * threads:   ThreadPoolExecutor over the in-memory buffers
+  * processes: docs_module.spill_to_file + ProcessPoolExecutor over the paths
+"""
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docs_module import extract_file, spill_to_file
+
+
+def make_pdf(pages: int, lines_per_page: int = 45) -> bytes:
+    """Minimal uncompressed PDF with one Helvetica text line per row"""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in range(pages):
+        rows = "".join(f"(Page {page} line {line}: the quick brown fox jumps over the lazy dog) Tj T* "
+                       for line in range(lines_per_page))
+        content = f"BT /F1 10 Tf 12 TL 40 800 Td {rows}ET".encode("ascii")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    out.write(b"".join(b"%010d 00000 n \n" % offset for offset in offsets))
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def run_mode(mode: str, files: int, pages: int, workers: int):
+    pdf = make_pdf(pages)
+    uploads = [io.BytesIO(pdf) for _ in range(files)]
+    names = [f"upload_{index}.pdf" for index in range(files)]
+    start = time.perf_counter()
+    if mode == "serial":
+        results = [extract_file(upload, name) for upload, name in zip(uploads, names)]
+    elif mode == "threads":
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(extract_file, uploads, names))
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [spill_to_file(upload, directory, name) for upload, name in zip(uploads, names)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(extract_file, paths, names))
+    seconds = time.perf_counter() - start
+    assert all(not result["error"] and result["text"] for result in results)
+    # ru_maxrss is KiB on Linux
+    print(json.dumps({
+        "seconds": seconds,
+        "parent_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "worker_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        "mb": len(pdf) * files / 1e6,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.mode:
+        return run_mode(args.mode, args.files, args.pages, args.workers)
+
+    print(f"{args.files} PDFs x {args.pages} pages, {args.workers} workers, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<12}{'seconds':>10}{'speedup':>9}{'parent MB':>11}{'worker MB':>11}")
+    baseline = None
+    for mode in ("serial", "threads", "processes"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--mode", mode, "--files", str(args.files),
+             "--pages", str(args.pages), "--workers", str(args.workers)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        baseline = baseline or result["seconds"]
+        print(f"{mode:<12}{result['seconds']:>10.2f}{baseline / result['seconds']:>8.1f}x"
+              f"{result['parent_mb']:>11.0f}{result['worker_mb']:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Compare HTML extraction engines on a local corpus of .html files.
+
+    python benchmarks/bench_html_extract.py path/to/html_corpus [--repeat 5]
+
+Reports pages/s and MB/s per engine plus output parity against the bs4
+reference extractor (exact title/link match and text similarity). A few
+built-in edge cases (non-ASCII page without <meta charset>, comment-only
+body, bare XML declaration) are also checked against their expected output.
+"""
+import argparse
+import difflib
+import glob
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_extract import available_engines, extract
+
+
+# (name, raw body, expected title, expected text)
+EDGE_CASES = [
+    ("utf-8 arabic, no meta charset",
+     "<html><head><title>مرحبا</title></head><body><p>السلام عليكم</p></body></html>".encode("utf-8"),
+     "مرحبا", "السلام عليكم"),
+    ("comment only", b"<!-- x -->", "No title found", ""),
+    ("xml declaration only", b'<?xml version="1.0" encoding="utf-8"?>', "No title found", ""),
+]
+
+
+def check_edge_cases(engine):
+    """Names of the edge cases the engine gets wrong (or raises on)"""
+    failures = []
+    for name, body, title, text in EDGE_CASES:
+        try:
+            result = extract(body, engine=engine)
+            if (result.title, result.text) != (title, text):
+                failures.append(name)
+        except Exception as e:
+            failures.append(f"{name} ({type(e).__name__})")
+    return failures
+
+
+def load_corpus(path):
+    files = sorted(glob.glob(os.path.join(path, "**", "*.htm*"), recursive=True))
+    corpus = []
+    for file_path in files:
+        with open(file_path, "rb") as file:
+            corpus.append((file_path, file.read()))
+    return corpus
+
+
+def time_engine(engine, corpus, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _, body in corpus:
+            extract(body, engine=engine)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def parity(engine, corpus):
+    titles = links = 0
+    ratios = []
+    for _, body in corpus:
+        reference = extract(body, engine="bs4")
+        candidate = extract(body, engine=engine)
+        titles += (reference.title or "").strip() == (candidate.title or "").strip()
+        links += reference.links == candidate.links
+        if reference.text == candidate.text:
+            ratios.append(1.0)
+        else:
+            matcher = difflib.SequenceMatcher(None, reference.text.splitlines(), candidate.text.splitlines())
+            ratios.append(matcher.ratio())
+    count = len(corpus)
+    return titles / count, links / count, sum(ratios) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", help="directory containing .html files")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        sys.exit(f"No .html files found under {args.corpus}")
+    total_mb = sum(len(body) for _, body in corpus) / 1e6
+    print(f"{len(corpus)} pages, {total_mb:.1f} MB, best of {args.repeat}\n")
+    print(f"{'engine':<12}{'pages/s':>10}{'MB/s':>10}{'speedup':>9}{'title':>8}{'links':>8}{'text':>8}")
+
+    baseline = None
+    for engine in available_engines():
+        elapsed = time_engine(engine, corpus, args.repeat)
+        baseline = baseline or elapsed
+        title_ok, links_ok, text_ratio = parity(engine, corpus)
+        print(f"{engine:<12}{len(corpus) / elapsed:>10.1f}{total_mb / elapsed:>10.2f}{baseline / elapsed:>8.1f}x"
+              f"{title_ok:>8.0%}{links_ok:>8.0%}{text_ratio:>8.1%}")
+
+    print()
+    for engine in available_engines():
+        failures = check_edge_cases(engine)
+        print(f"{engine:<12}edge cases: {'ok' if not failures else 'FAILED ' + ', '.join(failures)}")
+
+
+if __name__ == "__main__":
+    main()
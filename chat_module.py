@@ -0,0 +1,96 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain.chains.conversational_retrieval.prompts import CONDENSE_QUESTION_PROMPT
+from langchain.chains.question_answering.stuff_prompt import PROMPT as QA_PROMPT
+from langchain.schema import get_buffer_string
+
+
+# Words that usually point back at earlier turns ("what about it?", "explain that more")
+REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their", "he", "him", "his",
+    "she", "her", "there", "then", "above", "previous", "earlier", "same", "former", "latter",
+    "again", "more", "else", "also", "another", "other", "one", "ones",
+}
+FOLLOW_UP_OPENERS = ("and ", "but ", "so ", "what about", "how about", "why not", "also ", "then ")
+MIN_SELF_CONTAINED_WORDS = 5
+
+_retrieval_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="chat-retrieval")
+
+
+def is_self_contained(question: str) -> bool:
+    """Cheap local check for whether a question can be answered without the chat history"""
+    text = question.strip().lower()
+    words = re.findall(r"\w+", text)
+    if len(words) < MIN_SELF_CONTAINED_WORDS:
+        return False
+    if text.startswith(FOLLOW_UP_OPENERS):
+        return False
+    return not any(word in REFERENCE_WORDS for word in words)
+
+
+def merge_documents(*doc_lists, limit: int = None) -> List[Any]:
+    """Interleave retrieval results, dropping duplicate chunks"""
+    merged, seen = [], set()
+    for group in zip(*doc_lists):
+        for doc in group:
+            if doc.page_content not in seen:
+                seen.add(doc.page_content)
+                merged.append(doc)
+    for docs in doc_lists:
+        for doc in docs:
+            if doc.page_content not in seen:
+                seen.add(doc.page_content)
+                merged.append(doc)
+    return merged[:limit] if limit else merged
+
+
+class FastRetrievalChat:
+    """
+    Drop-in replacement for ConversationalRetrievalChain that answers with a
+    single LLM call unless the question really needs condensing
+    """
+
+    def __init__(self, llm, retriever, memory, max_context_docs: int = 4):
+        self.llm = llm
+        self.retriever = retriever
+        self.memory = memory
+        self.max_context_docs = max_context_docs
+        self.stats = {"turns": 0, "condensed": 0}
+
+    def retrieve(self, query: str) -> List[Any]:
+        return self.retriever.invoke(query)
+
+    def condense(self, question: str, chat_history) -> str:
+        prompt = CONDENSE_QUESTION_PROMPT.format(chat_history=get_buffer_string(chat_history), question=question)
+        return self.llm.invoke(prompt).content.strip()
+
+    def __call__(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        question = inputs["question"]
+        chat_history = self.memory.load_memory_variables({})[self.memory.memory_key]
+        self.stats["turns"] += 1
+
+        if not chat_history or is_self_contained(question):
+            generated_question = question
+            docs = self.retrieve(question)
+        else:
+            # Retrieve on the raw question while the condense call is in flight
+            speculative = _retrieval_executor.submit(self.retrieve, question)
+            generated_question = self.condense(question, chat_history)
+            self.stats["condensed"] += 1
+            raw_docs = speculative.result()
+            if generated_question.strip().lower() == question.strip().lower():
+                docs = raw_docs
+            else:
+                docs = merge_documents(self.retrieve(generated_question), raw_docs, limit=self.max_context_docs)
+
+        context = "\n\n".join(doc.page_content for doc in docs[:self.max_context_docs])
+        answer = self.llm.invoke(QA_PROMPT.format(context=context, question=generated_question)).content
+        self.memory.save_context({"question": question}, {"answer": answer})
+        return {
+            "question": question,
+            "generated_question": generated_question,
+            "answer": answer,
+            "source_documents": docs,
+        }
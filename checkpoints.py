@@ -0,0 +1,119 @@
+"""
+Stage checkpoints for resumable ingestion.
+
+Each ingest job gets a directory named after its source fingerprint. Every
+finished stage (downloaded audio, transcribed segments, extracted pages,
+embedded batches) is written there, so a retry after a failure resumes from
+the last good checkpoint. The directory is removed once the job completes.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from langchain.vectorstores import FAISS
+
+
+CHECKPOINT_ROOT = "ingest_checkpoints"
+# Checkpoints of jobs that were never retried are dropped after this long
+CHECKPOINT_MAX_AGE_SECONDS = 7 * 24 * 3600
+EMBED_BATCH_SIZE = 100
+
+
+class CheckpointStore:
+    """Checkpoint directory of one ingest job"""
+
+    def __init__(self, fingerprint: str, root: str = CHECKPOINT_ROOT):
+        self.fingerprint = fingerprint
+        self.directory = os.path.join(root, fingerprint)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def has(self, name: str) -> bool:
+        return os.path.exists(self.path(name))
+
+    def _write(self, name: str, data: bytes):
+        tmp_path = self.path(name) + ".tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        # Atomic rename: a crash never leaves a half-written checkpoint behind
+        os.replace(tmp_path, self.path(name))
+
+    def save_json(self, name: str, value):
+        self._write(name, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def load_json(self, name: str, default=None):
+        if not self.has(name):
+            return default
+        with open(self.path(name), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def save_text(self, name: str, text: str):
+        self._write(name, text.encode("utf-8"))
+
+    def load_text(self, name: str):
+        if not self.has(name):
+            return None
+        with open(self.path(name), "r", encoding="utf-8") as file:
+            return file.read()
+
+    def save_array(self, name: str, array):
+        tmp_path = self.path(name) + ".tmp"
+        with open(tmp_path, "wb") as file:
+            np.save(file, np.asarray(array, dtype=np.float32))
+        os.replace(tmp_path, self.path(name))
+
+    def load_array(self, name: str):
+        if not self.has(name):
+            return None
+        return np.load(self.path(name))
+
+    def complete(self):
+        """Drop all checkpoints of this job once it has finished"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def gc_checkpoints(root: str = CHECKPOINT_ROOT, max_age_seconds: float = CHECKPOINT_MAX_AGE_SECONDS):
+    """Remove checkpoint directories of abandoned jobs"""
+    if not os.path.isdir(root):
+        return
+    now = time.time()
+    for name in os.listdir(root):
+        directory = os.path.join(root, name)
+        try:
+            if os.path.isdir(directory) and now - os.path.getmtime(directory) > max_age_seconds:
+                shutil.rmtree(directory, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def embed_with_checkpoints(embeddings, texts, checkpoints: CheckpointStore, batch_size: int = EMBED_BATCH_SIZE):
+    """Embed texts batch by batch, saving every finished batch; finished batches are reused on retry"""
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        # The batch content is part of the name, so a changed chunking never reuses stale vectors
+        digest = hashlib.sha256("\0".join(batch).encode("utf-8")).hexdigest()[:16]
+        name = f"embeddings_{start // batch_size:05d}_{digest}.npy"
+        batch_vectors = checkpoints.load_array(name)
+        if batch_vectors is None:
+            batch_vectors = np.asarray(embeddings.embed_documents(batch), dtype=np.float32)
+            checkpoints.save_array(name, batch_vectors)
+        vectors.extend(batch_vectors.tolist())
+    return vectors
+
+
+def faiss_from_documents_with_checkpoints(documents, embeddings, checkpoints: CheckpointStore,
+                                          batch_size: int = EMBED_BATCH_SIZE):
+    """Checkpointed equivalent of FAISS.from_documents"""
+    texts = [document.page_content for document in documents]
+    vectors = embed_with_checkpoints(embeddings, texts, checkpoints, batch_size)
+    return FAISS.from_embeddings(
+        text_embeddings=list(zip(texts, vectors)),
+        embedding=embeddings,
+        metadatas=[document.metadata for document in documents],
+    )
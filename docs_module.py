@@ -6,82 +6,396 @@ from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
+from memory_module import RollingSummaryMemory
+from chat_module import FastRetrievalChat
+from knowledge_pack import KnowledgePack, KnowledgePackRetriever, faiss_contents, write_knowledge_pack
+from checkpoints import CheckpointStore, faiss_from_documents_with_checkpoints, gc_checkpoints
+from singleflight import collection_fingerprint, digest_fingerprint, file_fingerprint
+from llm_cache import cached_chat_completion
+import vector_search
 import PyPDF2
-import docx
+import hashlib
+import io
+import mmap
+import tempfile
+import time
+import zipfile
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 
 
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+# Streams that are not already in memory are buffered in RAM up to this size
+# and spilled to a memory-mapped temporary file above it.
+SPILL_THRESHOLD = 32 * 1024 * 1024
+# Summary text returned when the summary call fails; results carrying it are not final
+SUMMARY_ERROR_PREFIX = "Error generating document summary"
+# Extracted PDF pages are checkpointed every this many pages
+PDF_CHECKPOINT_PAGES = 25
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class MemoryViewStream(io.RawIOBase):
+    """Read-only, seekable file object over a memoryview, so parsers can read a buffer without copying it"""
+
+    def __init__(self, buffer):
+        self.source_view = memoryview(buffer)
+        self.view = self.source_view.cast("B")
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, target):
+        chunk = self.view[self.position:self.position + len(target)]
+        size = len(chunk)
+        target[:size] = chunk
+        self.position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            self.position = offset
+        elif whence == io.SEEK_CUR:
+            self.position += offset
+        elif whence == io.SEEK_END:
+            self.position = len(self.view) + offset
+        self.position = max(self.position, 0)
+        return self.position
+
+    def tell(self):
+        return self.position
+
+    def __len__(self):
+        return len(self.view)
+
+    def close(self):
+        if not self.closed:
+            self.view.release()
+            self.source_view.release()
+        super().close()
+
+
+@contextmanager
+def open_source(source, spill_threshold: int = SPILL_THRESHOLD):
+    """
+    Yield a seekable binary stream for a path, bytes/memoryview or file-like object.
+    In-memory sources (bytes, memoryview, BytesIO, Streamlit uploads) are read in
+    place; other streams are buffered in RAM below spill_threshold and spilled to
+    a memory-mapped temporary file above it.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            yield file
+        return
+
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        stream = MemoryViewStream(source)
+    elif hasattr(source, "getbuffer"):
+        stream = MemoryViewStream(source.getbuffer())
+    elif hasattr(source, "fileno") and getattr(source, "seekable", lambda: False)():
+        source.seek(0)
+        yield source
+        return
+    else:
+        stream = spill_stream(source, spill_threshold)
+    try:
+        yield stream
+    finally:
+        stream.close()
+
+
+def spill_stream(source, spill_threshold: int, digest=None):
+    """Buffer a stream in RAM up to spill_threshold, else in an mmap'd temp file; digest, if given, is fed every chunk"""
+    buffer = bytearray()
+    spill_file = None
+    while True:
+        chunk = source.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        if digest is not None:
+            digest.update(chunk)
+        if spill_file is None and len(buffer) + len(chunk) > spill_threshold:
+            spill_file = tempfile.TemporaryFile()
+            spill_file.write(buffer)
+            buffer = None
+        if spill_file is None:
+            buffer += chunk
+        else:
+            spill_file.write(chunk)
+    if spill_file is None:
+        return MemoryViewStream(buffer)
+    spill_file.flush()
+    if spill_file.tell() == 0:
+        spill_file.close()
+        return MemoryViewStream(b"")
+    mapping = mmap.mmap(spill_file.fileno(), 0, access=mmap.ACCESS_READ)
+    # The mapping stays valid after the file is closed; the OS frees it once the view is released
+    spill_file.close()
+    stream = MemoryViewStream(mapping)
+
+    close = stream.close
+
+    def close_mapping():
+        close()
+        mapping.close()
+
+    stream.close = close_mapping
+    return stream
+
+
+def spill_to_file(source, directory: str, name: str) -> str:
+    """
+    Write an in-memory or stream source to a file in directory, straight from its
+    buffer, so it can be handed to a worker process by path instead of being pickled
+    """
+    path = os.path.join(directory, f"{len(os.listdir(directory)):05d}{source_extension(source, name)}")
+    with open(path, "wb") as file:
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            file.write(source)
+        elif hasattr(source, "getbuffer"):
+            with source.getbuffer() as view:
+                file.write(view)
+        else:
+            with open_source(source) as stream:
+                for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b""):
+                    file.write(chunk)
+    return path
+
+
+def source_extension(source, filename: str = None) -> str:
+    name = filename or (source if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "")) or ""
+    return os.path.splitext(str(name))[1].lower()
+
+
+def buffer_source(source, spill_threshold: int = SPILL_THRESHOLD):
+    """
+    Return (source, fingerprint) with the source readable more than once. Paths and
+    in-memory buffers are returned as they are; any other stream is read exactly once,
+    into RAM or an mmap'd spill file, and fingerprinted in the same pass. The caller
+    closes the returned source if it is not the one passed in.
+    """
+    if isinstance(source, (str, os.PathLike, bytes, bytearray, memoryview)) or hasattr(source, "getbuffer"):
+        return source, file_fingerprint(source)
+    digest = hashlib.sha256()
+    return spill_stream(source, spill_threshold, digest), digest_fingerprint(digest)
+
+
+def source_size(source) -> int:
+    if isinstance(source, MemoryViewStream):
+        return len(source)
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).nbytes
+    if hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            return view.nbytes
+    if hasattr(source, "size"):
+        return source.size
+    return 0
+
+
+def iter_docx_paragraphs(source):
+    """Stream paragraph texts out of a DOCX file without building the whole document tree"""
+    with open_source(source) as stream, zipfile.ZipFile(stream) as archive:
+        with archive.open("word/document.xml") as xml_file:
+            parts = []
+            for event, element in ET.iterparse(xml_file, events=("end",)):
+                tag = element.tag
+                if tag == WORD_NAMESPACE + "t":
+                    parts.append(element.text or "")
+                elif tag == WORD_NAMESPACE + "tab":
+                    parts.append("\t")
+                elif tag in (WORD_NAMESPACE + "br", WORD_NAMESPACE + "cr"):
+                    parts.append("\n")
+                elif tag == WORD_NAMESPACE + "p":
+                    yield "".join(parts)
+                    parts = []
+                    # Drop the finished paragraph so memory stays flat on large files
+                    element.clear()
+
+
+def iter_pdf_pages(source, start: int = 0):
+    """Yield the text of each PDF page, beginning at page index start"""
+    with open_source(source) as stream:
+        pdf_reader = PyPDF2.PdfReader(stream)
+        for index in range(start, len(pdf_reader.pages)):
+            yield pdf_reader.pages[index].extract_text()
+
+
+def extract_pdf_text(source) -> str:
+    return "".join(page + "\n" for page in iter_pdf_pages(source))
+
+
+def extract_txt_text(source) -> str:
+    with open_source(source) as stream:
+        reader = io.TextIOWrapper(io.BufferedReader(stream) if isinstance(stream, io.RawIOBase) else stream, encoding='utf-8')
+        try:
+            return reader.read()
+        finally:
+            # Leave closing the underlying stream to open_source
+            reader.detach()
+
+
+def extract_text(source, filename: str = None) -> str:
+    """Extract text from a PDF, DOCX or TXT path, buffer or file-like object based on its extension"""
+    file_extension = source_extension(source, filename)
+    if file_extension == '.pdf':
+        return extract_pdf_text(source)
+    if file_extension == '.docx':
+        return "".join(paragraph + "\n" for paragraph in iter_docx_paragraphs(source))
+    if file_extension == '.txt':
+        return extract_txt_text(source)
+    raise ValueError(f"Unsupported file format: {file_extension}")
+
+
+def extract_file(source, name: str = None) -> dict:
+    """Pool worker: extract one path or in-memory source and report its size and timing"""
+    start = time.perf_counter()
+    if name is None:
+        name = os.path.basename(str(source)) if isinstance(source, (str, os.PathLike)) else getattr(source, "name", "document")
+    result = {"name": name, "text": "", "error": None}
+    try:
+        result["bytes"] = source_size(source)
+        result["text"] = extract_text(source, name)
+    except Exception as e:
+        result.setdefault("bytes", 0)
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
 class DocumentProcessor:
     def __init__(self):
         self.embeddings = None
         self.vector_store = None
         self.conversation_chain = None
         self.memory = None
+        self.document_vector_store = None
+        self.document_conversation_chain = None
+        self.document_memory = None
+        self.knowledge_pack = None
+        self.processed_document_text = None
+        self.document_summary = None
+        self.collection_stats = None
         self.MODEL = "gpt-4o-mini"
+        self.CHAT_MODE = "fast"
+        self.SUMMARY_TEMPLATE_VERSION = "document-summary-v1"
     def load_models(self):
         if self.embeddings is None:
             self.embeddings = OpenAIEmbeddings()
-    def extract_text_from_pdf(self, file_path: str) -> str:
-        """Extract text from PDF file"""
-        text = ""
+    def extract_text_from_pdf(self, source) -> str:
+        """Extract text from a PDF path or stream"""
         try:
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    text += page.extract_text() + "\n"
+            return extract_pdf_text(source)
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
-        return text
 
-    def extract_text_from_python_docx(self, file_path: str):
-        """Extract text from python_docx file"""
+    def extract_text_from_docx(self, source) -> str:
+        """Extract text from a DOCX path or stream"""
         try:
-            doc = python_docx.Document(file_path)
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-            return text
+            return "".join(paragraph + "\n" for paragraph in iter_docx_paragraphs(source))
         except Exception as e:
-            raise Exception(f"Error reading python_docx: {str(e)}")
+            raise Exception(f"Error reading DOCX: {str(e)}")
 
-    def extract_text_from_txt(self, file_path: str) -> str:
-        """Extract text from TXT file"""
+    def extract_text_from_txt(self, source) -> str:
+        """Extract text from a TXT path or stream"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return file.read()
+            return extract_txt_text(source)
         except Exception as e:
             raise Exception(f"Error reading TXT: {str(e)}")
 
-    def process_document(self, file_path: str):
+    def extract_text_with_checkpoints(self, source, file_extension: str, checkpoints: CheckpointStore) -> str:
+        """Extract text, resuming a PDF from its last checkpointed page"""
+        text = checkpoints.load_text("text.txt")
+        if text is not None:
+            return text
+        if file_extension == '.pdf':
+            # Each batch is its own checkpoint named by its first page, so every page is written once
+            pages = []
+            while True:
+                saved = checkpoints.load_json(f"pages_{len(pages):05d}.json")
+                if not saved:
+                    break
+                pages.extend(saved)
+            batch = []
+            try:
+                for page in iter_pdf_pages(source, start=len(pages)):
+                    batch.append(page)
+                    if len(batch) == PDF_CHECKPOINT_PAGES:
+                        checkpoints.save_json(f"pages_{len(pages):05d}.json", batch)
+                        pages.extend(batch)
+                        batch = []
+            except Exception as e:
+                if batch:
+                    checkpoints.save_json(f"pages_{len(pages):05d}.json", batch)
+                raise Exception(f"Error reading PDF: {str(e)}")
+            pages.extend(batch)
+            text = "".join(page + "\n" for page in pages)
+        elif file_extension == '.docx':
+            text = self.extract_text_from_docx(source)
+        else:
+            text = self.extract_text_from_txt(source)
+        checkpoints.save_text("text.txt", text)
+        return text
+
+    def process_document(self, source, filename: str = None, fingerprint: str = None):
+        """
+        Process one document given as a file path, bytes/memoryview or file-like
+        object (e.g. a Streamlit upload). filename supplies the extension for
+        sources that have no name. Extracted text and embedding batches are
+        checkpointed, so processing the same file again after a failure resumes;
+        fingerprint is the source's file_fingerprint if the caller already has it.
+        """
         try:
-            file_extension = os.path.splitext(file_path)[1].lower()
-            if file_extension == '.pdf':
-                text = self.extract_text_from_pdf(file_path)
-            elif file_extension == '.python_docx':
-                text = self.extract_text_from_python_docx(file_path)
-            elif file_extension == '.txt':
-                text = self.extract_text_from_txt(file_path)
-            else:
+            file_extension = source_extension(source, filename)
+            if file_extension not in SUPPORTED_EXTENSIONS:
                 return "", "", f"Unsupported file format: {file_extension}"
 
+            gc_checkpoints()
+            buffered = source
+            if fingerprint is None:
+                # One-pass streams are buffered while hashing, so they can still be extracted afterwards
+                buffered, fingerprint = buffer_source(source)
+            try:
+                checkpoints = CheckpointStore(fingerprint)
+                text = self.extract_text_with_checkpoints(buffered, file_extension, checkpoints)
+            finally:
+                if buffered is not source:
+                    buffered.close()
+
             if not text.strip():
+                checkpoints.complete()
                 return "", "", "No text found in the document"
 
             self.processed_document_text = text
 
-            self.create_document_vector_store(text)
+            self.create_document_vector_store(text, checkpoints=checkpoints)
             summary = self.generate_document_summary(text)
+            self.document_summary = summary
+            if summary.startswith(SUMMARY_ERROR_PREFIX):
+                # Checkpoints are kept, so a retry only repeats the summary
+                return text, summary, f"Document processed with errors: {summary}"
+            checkpoints.complete()
             return text, summary, "Document processed successfully!"
 
         except Exception as e:
             return "", "", f"Error processing document: {str(e)}"
 
-    def create_document_vector_store(self, text: str):
+    def create_document_vector_store(self, text: str, checkpoints=None):
         """Create FAISS vector store from document text"""
         self.load_models()
         text_splitter = RecursiveCharacterTextSplitter(
@@ -93,29 +407,193 @@ class DocumentProcessor:
         chunks = text_splitter.split_text(text)
         documents = [Document(page_content=chunk) for chunk in chunks]
 
-        self.document_vector_store = FAISS.from_documents(documents, self.embeddings)
+        return self.build_document_index(documents, checkpoints=checkpoints)
+
+    def build_document_index(self, documents, checkpoints=None):
+        """Embed prepared chunks into one FAISS store and set up the conversation chain"""
+        self.load_models()
+        if checkpoints is not None:
+            self.document_vector_store = faiss_from_documents_with_checkpoints(documents, self.embeddings, checkpoints)
+        else:
+            self.document_vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.knowledge_pack = None
 
         self.setup_document_conversation_chain()
 
         return self.document_vector_store
 
-    def setup_document_conversation_chain(self):
+    def process_documents(self, sources, names=None, max_workers: int = None, fingerprints=None):
+        """
+        Ingest a collection of PDF/DOCX/TXT files into a single index.
+        Files are extracted in parallel in a process pool; in-memory sources (uploads,
+        buffers) are first written to temporary files from their buffers, so workers
+        read them from disk instead of receiving pickled copies.
+        Each chunk keeps its source name (or the matching entry of names) in its metadata.
+        fingerprints are the sources' file_fingerprints if the caller already has them.
+        """
+        try:
+            sources = list(sources)
+            if names is None:
+                names = [os.path.basename(str(source)) if isinstance(source, (str, os.PathLike)) else getattr(source, "name", f"document_{index + 1}")
+                         for index, source in enumerate(sources)]
+            names = list(names)
+            unsupported = [name for source, name in zip(sources, names) if source_extension(source, name) not in SUPPORTED_EXTENSIONS]
+            if unsupported:
+                return "", "", f"Unsupported file format: {', '.join(unsupported)}"
+            if not sources:
+                return "", "", "No documents to process"
+
+            gc_checkpoints()
+            if fingerprints is None:
+                original_sources = sources
+                sources, fingerprints = [], []
+                for source in original_sources:
+                    buffered, fingerprint = buffer_source(source)
+                    sources.append(buffered)
+                    fingerprints.append(fingerprint)
+                buffered_sources = [buffered for buffered, source in zip(sources, original_sources) if buffered is not source]
+            else:
+                fingerprints = list(fingerprints)
+                buffered_sources = []
+            try:
+                return self._process_collection(sources, names, max_workers, fingerprints)
+            finally:
+                for buffered in buffered_sources:
+                    buffered.close()
+
+        except Exception as e:
+            return "", "", f"Error processing documents: {str(e)}"
+
+    def _process_collection(self, sources, names, max_workers, fingerprints):
+        """Extract, index and summarize a validated collection; see process_documents"""
+        checkpoints = CheckpointStore(collection_fingerprint(fingerprints))
+        # Files extracted by an earlier, failed attempt are reused; only the rest are extracted
+        results = [checkpoints.load_json(f"{fingerprint}.json") for fingerprint in fingerprints]
+        pending = [index for index, result in enumerate(results) if result is None]
+
+        start = time.perf_counter()
+        workers = max_workers or min(len(sources), os.cpu_count() or 1)
+        pending_sources = [sources[index] for index in pending]
+        pending_names = [names[index] for index in pending]
+        if workers > 1 and len(pending) > 1:
+            # PDF extraction is pure Python, so threads would serialize on the GIL: in-memory
+            # sources (uploads) are written to temporary files and extracted in processes too
+            with tempfile.TemporaryDirectory(prefix="docs_") as spill_directory:
+                paths = [source if isinstance(source, (str, os.PathLike)) else spill_to_file(source, spill_directory, name)
+                         for source, name in zip(pending_sources, pending_names)]
+                with ProcessPoolExecutor(max_workers=workers) as pool:
+                    extracted = pool.map(extract_file, paths, pending_names)
+                    self._collect_extracted(pending, extracted, results, fingerprints, checkpoints)
+        else:
+            extracted = (extract_file(source, name) for source, name in zip(pending_sources, pending_names))
+            self._collect_extracted(pending, extracted, results, fingerprints, checkpoints)
+        extract_seconds = time.perf_counter() - start
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            length_function=len,
+        )
+        documents = []
+        sections = []
+        for result in results:
+            if result["error"] or not result["text"].strip():
+                continue
+            sections.append(f"===== {result['name']} =====\n{result['text']}")
+            for index, chunk in enumerate(text_splitter.split_text(result["text"])):
+                documents.append(Document(page_content=chunk, metadata={"source": result["name"], "chunk": index}))
+
+        if not documents:
+            errors = "; ".join(f"{r['name']}: {r['error']}" for r in results if r["error"])
+            return "", "", f"No text found in the documents{' (' + errors + ')' if errors else ''}"
+
+        embed_start = time.perf_counter()
+        self.build_document_index(documents, checkpoints=checkpoints)
+        embed_seconds = time.perf_counter() - embed_start
+
+        text = "\n\n".join(sections)
+        self.processed_document_text = text
+        summary = self.generate_document_summary(text)
+        self.document_summary = summary
+
+        total_bytes = sum(r["bytes"] for r in results)
+        self.collection_stats = {
+            "files": len(results),
+            "failed": [r["name"] for r in results if r["error"]],
+            "bytes": total_bytes,
+            "characters": sum(len(r["text"]) for r in results),
+            "chunks": len(documents),
+            "workers": workers,
+            "extract_seconds": extract_seconds,
+            "extract_cpu_seconds": sum(r["seconds"] for r in results),
+            "embed_seconds": embed_seconds,
+            "files_per_second": len(results) / extract_seconds if extract_seconds else 0.0,
+            "mb_per_second": total_bytes / 1e6 / extract_seconds if extract_seconds else 0.0,
+        }
+        failed = self.collection_stats["failed"]
+        processed = f"{len(results) - len(failed)} of {len(results)} documents processed"
+        errors = [f"{r['name']}: {r['error']}" for r in results if r["error"]]
+        if summary.startswith(SUMMARY_ERROR_PREFIX):
+            errors.append(summary)
+        if errors:
+            # Checkpoints are kept, so a retry only re-extracts the failed files and repeats the summary
+            return text, summary, f"{processed} with errors: {'; '.join(errors)}"
+        checkpoints.complete()
+        return text, summary, f"{processed} successfully!"
+
+    @staticmethod
+    def _collect_extracted(positions, extracted, results, fingerprints, checkpoints):
+        """Place extraction results as they arrive, checkpointing each successful file"""
+        for index, result in zip(positions, extracted):
+            results[index] = result
+            if not result["error"]:
+                checkpoints.save_json(f"{fingerprints[index]}.json", result)
+
+    def export_knowledge_pack(self, path: str):
+        """Write the processed document(s) index, text and summary to one knowledge pack file"""
+        if self.document_vector_store is None:
+            raise ValueError("No document processed yet. Please process a document first.")
+        vectors, chunks, metadata = faiss_contents(self.document_vector_store)
+        info = {
+            "kind": "document",
+            "sources": sorted({meta["source"] for meta in metadata if "source" in meta}),
+            "embedding_model": getattr(self.embeddings, "model", None),
+        }
+        return write_knowledge_pack(path, vectors, chunks, metadata, summary=self.document_summary,
+                                    text=self.processed_document_text, info=info)
+
+    def load_knowledge_pack(self, path: str):
+        """Memory-map a knowledge pack and chat with it without rebuilding the index"""
+        self.load_models()
+        self.knowledge_pack = KnowledgePack(path)
+        self.document_vector_store = None
+        self.processed_document_text, self.document_summary = self.knowledge_pack.text, self.knowledge_pack.summary
+        self.setup_document_conversation_chain(KnowledgePackRetriever(pack=self.knowledge_pack, embeddings=self.embeddings))
+        return self.knowledge_pack
+
+    def setup_document_conversation_chain(self, retriever=None):
         """Setup the conversational retrieval chain for documents"""
-        if self.document_vector_store is not None:
-            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
-            self.document_memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
+        if retriever is None and self.document_vector_store is not None:
             retriever = self.document_vector_store.as_retriever()
-            self.document_conversation_chain = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=retriever,
-                memory=self.document_memory
-            )
+        if retriever is not None:
+            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
+            self.document_memory = RollingSummaryMemory(llm=llm, memory_id="document", memory_key='chat_history', return_messages=True)
+            if self.CHAT_MODE == "fast":
+                self.document_conversation_chain = FastRetrievalChat(llm, retriever, self.document_memory)
+            else:
+                self.document_conversation_chain = ConversationalRetrievalChain.from_llm(
+                    llm=llm,
+                    retriever=retriever,
+                    memory=self.document_memory
+                )
 
     def generate_document_summary(self, text: str) -> str:
         """Generate summary for document using OpenAI GPT"""
         try:
             client = openai.OpenAI()
-            response = client.chat.completions.create(
+            return cached_chat_completion(
+                client.chat.completions.create,
+                template_version=self.SUMMARY_TEMPLATE_VERSION,
                 model="gpt-4o-mini",
                 messages=[
                     {
@@ -145,9 +623,8 @@ class DocumentProcessor:
                 max_tokens=500,
                 temperature=0.3
             )
-            return response.choices[0].message.content
         except Exception as e:
-            return f"Error generating document summary: {str(e)}"
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
 
     def chat_with_document(self, question: str):
         """Chat with the document content using conversational retrieval"""
@@ -169,11 +646,31 @@ class DocumentProcessor:
 
     def search_document_vector_store(self, query: str, k: int = 3):
         """Search the document vector store for relevant chunks"""
-        if self.document_vector_store is None:
+        if self.document_vector_store is None and self.knowledge_pack is None:
             return ["No document processed yet. Process a document first."]
 
         try:
-            docs = self.document_vector_store.similarity_search(query, k=k)
+            if self.document_vector_store is None:
+                docs = self.knowledge_pack.search(self.embeddings.embed_query(query), k=k)
+            else:
+                docs = self.document_vector_store.similarity_search(query, k=k)
             return [doc.page_content for doc in docs]
         except Exception as e:
-            return [f"Error searching document: {str(e)}"]
\ No newline at end of file
+            return [f"Error searching document: {str(e)}"]
+
+    def batch_search(self, queries, k: int = 4, fetch_k: int = 20, mmr: bool = False, lambda_mult: float = 0.5,
+                     return_documents: bool = False):
+        """
+        Search the processed document(s) for many queries at once: one embedding call and one
+        matrix index search, with optional MMR re-ranking of the top fetch_k hits.
+        Returns one list of chunk texts (or Documents) per query.
+        """
+        store = self.document_vector_store if self.document_vector_store is not None else self.knowledge_pack
+        if store is None:
+            raise ValueError("No document processed yet. Please process a document first.")
+        self.load_models()
+        results = vector_search.batch_search(store, self.embeddings, queries, k=k, fetch_k=fetch_k,
+                                             mmr=mmr, lambda_mult=lambda_mult)
+        if return_documents:
+            return results
+        return [[doc.page_content for doc in docs] for docs in results]
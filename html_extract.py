@@ -0,0 +1,165 @@
+"""
+Pluggable HTML extraction backends for Website.
+
+Every engine returns an Extraction(title, text, links, anchors) where text
+matches BeautifulSoup's body.get_text(separator="\\n", strip=True) after
+dropping script/style/img/input tags, links are the non-empty hrefs of <a>
+tags and anchors pairs each of those hrefs with its link text.
+"""
+import re
+from collections import namedtuple
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.parser import HTMLParser
+except ImportError:
+    HTMLParser = None
+
+from bs4 import BeautifulSoup, UnicodeDammit
+
+
+Extraction = namedtuple("Extraction", ["title", "text", "links", "anchors"])
+
+NO_TITLE = "No title found"
+SKIP_TAGS = {"script", "style", "img", "input"}
+# Page chrome that rarely carries content worth indexing
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "noscript", "form", "iframe", "svg", "template"}
+XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+
+
+def decode_body(body, encoding: str = None) -> str:
+    """
+    Decode raw HTML once for every engine. encoding is the charset from the
+    HTTP Content-Type header, if any; it wins over <meta charset>, and without
+    either the bytes are sniffed (UTF-8 before Windows-1252) as bs4 does.
+    """
+    if isinstance(body, str):
+        return body
+    known = [encoding] if encoding else []
+    text = UnicodeDammit(body, known_definite_encodings=known, is_html=True).unicode_markup
+    return text if text is not None else body.decode("utf-8", errors="replace")
+
+
+def extract_bs4(body, strip_boilerplate: bool = False) -> Extraction:
+    """Reference extractor using BeautifulSoup's pure-Python html.parser"""
+    soup = BeautifulSoup(body, 'html.parser')
+    title = soup.title.string if soup.title else NO_TITLE
+    anchors = [(link.get('href'), link.get_text(" ", strip=True)) for link in soup.find_all('a')]
+    anchors = [(href, label) for href, label in anchors if href]
+    links = [href for href, _ in anchors]
+    if soup.body:
+        skip = SKIP_TAGS | BOILERPLATE_TAGS if strip_boilerplate else SKIP_TAGS
+        for irrelevant in soup.body(list(skip)):
+            irrelevant.decompose()
+        text = soup.body.get_text(separator="\n", strip=True)
+    else:
+        text = ""
+    return Extraction(title, text, links, anchors)
+
+
+def extract_lxml(body, strip_boilerplate: bool = False) -> Extraction:
+    """Collect title, body text and links in one walk over an lxml tree"""
+    if isinstance(body, str):
+        # lxml refuses str input that still carries an encoding declaration
+        body = XML_DECLARATION.sub("", body, count=1)
+    if not body or not body.strip():
+        return Extraction(NO_TITLE, "", [], [])
+    try:
+        root = lxml.html.document_fromstring(body)
+    except lxml.etree.ParserError:
+        # Only comments or declarations, no elements
+        return Extraction(NO_TITLE, "", [], [])
+    skip = SKIP_TAGS | BOILERPLATE_TAGS if strip_boilerplate else SKIP_TAGS
+    title = None
+    anchors = []
+    parts = []
+    in_body = 0
+    skipping = 0
+    # Explicit stack instead of iterwalk, which silently drops comments and their tails
+    stack = [(root, False)]
+    while stack:
+        element, closing = stack.pop()
+        tag = element.tag
+        if not isinstance(tag, str):
+            # Comments and processing instructions: only their tail is text
+            if in_body and not skipping and element.tail:
+                parts.append(element.tail)
+            continue
+        if not closing:
+            if tag == "title" and title is None:
+                title = element.text
+            elif tag == "a":
+                href = element.get("href")
+                if href:
+                    anchors.append((href, " ".join(element.text_content().split())))
+            if tag == "body":
+                in_body += 1
+            if in_body:
+                if tag in skip:
+                    skipping += 1
+                elif not skipping and element.text:
+                    parts.append(element.text)
+            stack.append((element, True))
+            stack.extend((child, False) for child in reversed(element))
+        else:
+            if in_body and tag in skip:
+                skipping -= 1
+            if tag == "body":
+                in_body -= 1
+            if in_body and not skipping and element.tail:
+                parts.append(element.tail)
+    text = "\n".join(part.strip() for part in parts if part.strip())
+    links = [href for href, _ in anchors]
+    return Extraction(title if title is not None else NO_TITLE, text, links, anchors)
+
+
+def extract_selectolax(body, strip_boilerplate: bool = False) -> Extraction:
+    """Extract with selectolax's C-backed Lexbor parser"""
+    tree = HTMLParser(body)
+    title_node = tree.css_first("title")
+    title = title_node.text() if title_node is not None else NO_TITLE
+    anchors = [(node.attributes.get("href"), " ".join(node.text().split())) for node in tree.css("a")]
+    anchors = [(href, label) for href, label in anchors if href]
+    links = [href for href, _ in anchors]
+    if tree.body is not None:
+        skip = SKIP_TAGS | BOILERPLATE_TAGS if strip_boilerplate else SKIP_TAGS
+        tree.strip_tags(list(skip))
+        text = tree.body.text(separator="\n", strip=True)
+    else:
+        text = ""
+    return Extraction(title, text, links, anchors)
+
+
+ENGINES = {
+    "bs4": extract_bs4,
+    "lxml": extract_lxml,
+    "selectolax": extract_selectolax,
+}
+
+
+def available_engines():
+    engines = ["bs4"]
+    if lxml is not None:
+        engines.append("lxml")
+    if HTMLParser is not None:
+        engines.append("selectolax")
+    return engines
+
+
+DEFAULT_ENGINE = "lxml" if lxml is not None else "bs4"
+
+
+def extract(body, engine: str = None, strip_boilerplate: bool = False, encoding: str = None) -> Extraction:
+    """
+    Extract title, text and links from raw HTML with the chosen engine.
+    Bytes are decoded first (see decode_body), so every engine sees the same text.
+    """
+    engine = engine or DEFAULT_ENGINE
+    if engine not in available_engines():
+        raise ValueError(f"HTML engine '{engine}' is not available; choose from {available_engines()}")
+    return ENGINES[engine](decode_body(body, encoding), strip_boilerplate=strip_boilerplate)
@@ -0,0 +1,186 @@
+"""
+Single-file "knowledge pack" format for a processed source.
+
+Layout (all sections 64-byte aligned, offsets relative to the data start):
+
+    b"KPACK001" | uint64 header length | JSON header | padding | sections...
+
+Sections: vectors (float32, count x dim, contiguous), norms (float32, count),
+chunk_offsets / meta_offsets (uint64, count + 1) and the utf-8 blobs they
+index (chunks, meta), plus summary and text. A pack is opened with mmap, so
+vectors are searched in place and a chunk is only decoded when it is returned.
+Many worker processes can open the same pack and share its pages read-only.
+"""
+import json
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+
+
+MAGIC = b"KPACK001"
+ALIGNMENT = 64
+PACK_EXTENSION = ".kpack"
+
+
+def _encode_blob(items: List[bytes]):
+    offsets = np.zeros(len(items) + 1, dtype=np.uint64)
+    if items:
+        offsets[1:] = np.cumsum([len(item) for item in items], dtype=np.uint64)
+    return offsets, b"".join(items)
+
+
+def _pad(size: int) -> int:
+    return (-size) % ALIGNMENT
+
+
+def write_knowledge_pack(path: str, vectors, chunks: List[str], chunk_metadata: List[Dict[str, Any]] = None,
+                         summary: str = "", text: str = "", info: Dict[str, Any] = None) -> str:
+    """Write vectors, chunk texts and metadata, summary and full text into one pack file"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2 or vectors.shape[0] != len(chunks):
+        raise ValueError("vectors must be a (len(chunks), dim) array")
+    chunk_metadata = chunk_metadata or [{} for _ in chunks]
+
+    chunk_offsets, chunk_blob = _encode_blob([chunk.encode("utf-8") for chunk in chunks])
+    meta_offsets, meta_blob = _encode_blob([json.dumps(meta, ensure_ascii=False).encode("utf-8") for meta in chunk_metadata])
+    sections = [
+        ("vectors", vectors.tobytes()),
+        ("norms", np.einsum("ij,ij->i", vectors, vectors).astype(np.float32).tobytes()),
+        ("chunk_offsets", chunk_offsets.tobytes()),
+        ("chunks", chunk_blob),
+        ("meta_offsets", meta_offsets.tobytes()),
+        ("meta", meta_blob),
+        ("summary", (summary or "").encode("utf-8")),
+        ("text", (text or "").encode("utf-8")),
+    ]
+
+    layout = {}
+    position = 0
+    for name, data in sections:
+        layout[name] = [position, len(data)]
+        position += len(data) + _pad(len(data))
+    header = {
+        "version": 1,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "created": time.time(),
+        "info": info or {},
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode("utf-8")
+    prefix = MAGIC + struct.pack("<Q", len(header_bytes)) + header_bytes
+    prefix += b"\0" * _pad(len(prefix))
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(prefix)
+        for _, data in sections:
+            file.write(data)
+            file.write(b"\0" * _pad(len(data)))
+    os.replace(tmp_path, path)
+    return path
+
+
+def faiss_contents(vector_store):
+    """Pull vectors, chunk texts and metadata out of a LangChain FAISS store in index order"""
+    index = vector_store.index
+    vectors = index.reconstruct_n(0, index.ntotal)
+    chunks, metadata = [], []
+    for position in range(index.ntotal):
+        document = vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+        chunks.append(document.page_content)
+        metadata.append(document.metadata or {})
+    return vectors, chunks, metadata
+
+
+class KnowledgePack:
+    """Read-only, memory-mapped view of a knowledge pack file"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a knowledge pack")
+        (header_length,) = struct.unpack_from("<Q", self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(self._mmap[header_start:header_start + header_length].decode("utf-8"))
+        self._data_start = header_start + header_length + _pad(header_start + header_length)
+        self.count = self.header["count"]
+        self.dim = self.header["dim"]
+        self.info = self.header.get("info", {})
+
+        self.vectors = self._array("vectors", np.float32).reshape(self.count, self.dim)
+        self.norms = self._array("norms", np.float32)
+        self._chunk_offsets = self._array("chunk_offsets", np.uint64)
+        self._meta_offsets = self._array("meta_offsets", np.uint64)
+
+    def _section(self, name: str):
+        offset, length = self.header["sections"][name]
+        start = self._data_start + offset
+        return start, length
+
+    def _array(self, name: str, dtype):
+        start, length = self._section(name)
+        return np.frombuffer(self._mmap, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start)
+
+    def _blob_item(self, name: str, offsets, position: int) -> bytes:
+        start, _ = self._section(name)
+        return self._mmap[start + int(offsets[position]):start + int(offsets[position + 1])]
+
+    def chunk(self, position: int) -> str:
+        return self._blob_item("chunks", self._chunk_offsets, position).decode("utf-8")
+
+    def metadata(self, position: int) -> Dict[str, Any]:
+        return json.loads(self._blob_item("meta", self._meta_offsets, position).decode("utf-8"))
+
+    def document(self, position: int) -> Document:
+        return Document(page_content=self.chunk(position), metadata=self.metadata(position))
+
+    @property
+    def summary(self) -> str:
+        start, length = self._section("summary")
+        return self._mmap[start:start + length].decode("utf-8")
+
+    @property
+    def text(self) -> str:
+        start, length = self._section("text")
+        return self._mmap[start:start + length].decode("utf-8")
+
+    def search_batch(self, queries, k: int = 4):
+        """Exact squared-L2 search (same ranking as faiss.IndexFlatL2); returns (distances, indices)"""
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        k = min(k, self.count)
+        if k == 0:
+            return np.empty((len(queries), 0), dtype=np.float32), np.empty((len(queries), 0), dtype=np.int64)
+        distances = self.norms[None, :] - 2.0 * (queries @ self.vectors.T) + np.einsum("ij,ij->i", queries, queries)[:, None]
+        indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        top = np.take_along_axis(distances, indices, axis=1)
+        order = np.argsort(top, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+    def search(self, query_vector, k: int = 4) -> List[Document]:
+        _, indices = self.search_batch(query_vector, k)
+        return [self.document(int(position)) for position in indices[0]]
+
+    def close(self):
+        # Drop the numpy views first; the mmap cannot close while they export its buffer
+        self.vectors = self.norms = self._chunk_offsets = self._meta_offsets = None
+        self._mmap.close()
+
+
+class KnowledgePackRetriever(BaseRetriever):
+    """LangChain retriever that embeds the query and searches a memory-mapped pack"""
+
+    pack: Any
+    embeddings: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None) -> List[Document]:
+        return self.pack.search(self.embeddings.embed_query(query), k=self.k)
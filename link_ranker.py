@@ -0,0 +1,168 @@
+"""
+Local ranking of the links on a landing page, used by get_links to pick the
+About/Company/Careers-style pages without an LLM round trip.
+"""
+import re
+import threading
+import time
+from typing import Dict, List, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse
+
+
+# Category -> keywords matched against URL path segments and anchor text
+LINK_CATEGORIES = {
+    "about page": ["about", "about-us", "aboutus", "who-we-are", "our-story", "story", "mission", "overview"],
+    "company page": ["company", "corporate", "leadership", "team", "our-team", "people", "management", "investors", "press", "news"],
+    "careers page": ["careers", "career", "jobs", "job", "join-us", "join", "work-with-us", "hiring", "vacancies", "opportunities"],
+    "customers page": ["customers", "clients", "case-studies", "case-study", "partners", "testimonials"],
+    "products page": ["products", "product", "services", "solutions", "platform", "features", "pricing"],
+}
+CATEGORY_WEIGHTS = {
+    "about page": 1.0,
+    "company page": 0.9,
+    "careers page": 1.0,
+    "customers page": 0.7,
+    "products page": 0.6,
+}
+EXCLUDED_WORDS = [
+    "terms", "tos", "privacy", "cookie", "cookies", "legal", "gdpr", "disclaimer", "imprint", "impressum",
+    "login", "log-in", "signin", "sign-in", "signup", "sign-up", "register", "account", "cart", "checkout",
+    "unsubscribe", "rss", "feed",
+]
+EXCLUDED_SCHEMES = ("mailto:", "tel:", "javascript:", "sms:", "data:", "ftp:")
+EXCLUDED_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".zip", ".mp4", ".mp3", ".xml", ".css", ".js")
+
+MAX_LINKS = 6
+# Below this top score the ranking is considered unsure and get_links asks the LLM
+CONFIDENCE_THRESHOLD = 0.5
+
+
+def host_key(url: str) -> str:
+    host = urlparse(url).netloc.lower().split("@")[-1].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def normalize_link(base_url: str, href: str):
+    """Resolve href against the page URL; return None for links that are never brochure pages"""
+    href = (href or "").strip()
+    if not href or href.startswith("#") or href.lower().startswith(EXCLUDED_SCHEMES):
+        return None
+    url, _ = urldefrag(urljoin(base_url, href))
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https"):
+        return None
+    base_host = host_key(base_url)
+    link_host = host_key(url)
+    if link_host != base_host and not link_host.endswith("." + base_host):
+        return None
+    if parsed.path.lower().endswith(EXCLUDED_EXTENSIONS):
+        return None
+    path = parsed.path.rstrip("/") or "/"
+    if path == "/" and not parsed.query and link_host == base_host:
+        # The landing page itself; roots of subdomains such as careers.example.com are kept
+        return None
+    return parsed._replace(netloc=parsed.netloc.lower(), path=path).geturl()
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in re.split(r"[^a-z0-9]+", text.lower()) if token]
+
+
+def candidate_links(base_url: str, anchors: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Normalize, filter and dedupe (href, anchor text) pairs, keeping the first anchor text per URL"""
+    seen = {}
+    for href, label in anchors:
+        url = normalize_link(base_url, href)
+        if url is None:
+            continue
+        path = urlparse(url).path.lower()
+        words = set(tokenize(path)) | set(tokenize(label or ""))
+        if words & set(EXCLUDED_WORDS) or any(word in path for word in ("terms-of", "privacy-policy")):
+            continue
+        key = url.lower()
+        if key not in seen:
+            seen[key] = (url, label or "")
+        elif not seen[key][1] and label:
+            seen[key] = (url, label)
+    return list(seen.values())
+
+
+def subdomain_labels(url: str) -> List[str]:
+    """Host labels left of the registered domain, e.g. ["careers"] for careers.example.com"""
+    return host_key(url).split(".")[:-2]
+
+
+def score_link(url: str, label: str) -> Tuple[str, float]:
+    """Return the best category for a link and a score in [0, 1]"""
+    segments = [segment for segment in urlparse(url).path.lower().split("/") if segment]
+    host_labels = subdomain_labels(url)
+    # Keywords inside a longer segment ("/about-acme") only count in the first segment;
+    # deeper ones are usually article slugs ("/blog/2023/10/about-our-new-product")
+    first_tokens = set(tokenize(segments[0])) if segments else set()
+    label_text = " " + " ".join(tokenize(label)) + " "
+    best_type, best_score = None, 0.0
+    for category, keywords in LINK_CATEGORIES.items():
+        score = 0.0
+        for keyword in keywords:
+            if keyword in segments or keyword in host_labels:
+                score = max(score, 0.7)
+            elif "-" not in keyword and keyword in first_tokens:
+                score = max(score, 0.55)
+        if any(" " + keyword.replace("-", " ") + " " in label_text for keyword in keywords):
+            score += 0.3
+        if score:
+            # Brochure pages sit near the root; deep links are usually articles or listings
+            score -= 0.1 * max(len(segments) - 1, 0)
+            score *= CATEGORY_WEIGHTS[category]
+        if score > best_score:
+            best_type, best_score = category, score
+    return best_type, min(max(best_score, 0.0), 1.0)
+
+
+def rank_links(candidates: List[Tuple[str, str]], max_links: int = MAX_LINKS):
+    """
+    Score candidate links locally. Returns ({"links": [...]}, confidence) in the
+    same shape get_links has always returned.
+    """
+    scored = []
+    for url, label in candidates:
+        link_type, score = score_link(url, label)
+        if link_type is not None and score > 0.2:
+            scored.append((score, link_type, url))
+    scored.sort(key=lambda item: item[0], reverse=True)
+    chosen = [{"type": link_type, "url": url} for _, link_type, url in scored[:max_links]]
+    confidence = scored[0][0] if scored else 0.0
+    return {"links": chosen}, confidence
+
+
+class LinkDecisionCache:
+    """Thread-safe per-domain cache of link selections with a time-to-live"""
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_domains: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_domains = max_domains
+        self._entries: Dict[str, Tuple[float, dict]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str):
+        key = host_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, decision = entry
+            if time.time() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            return decision
+
+    def set(self, url: str, decision: dict):
+        with self._lock:
+            if len(self._entries) >= self.max_domains:
+                oldest = min(self._entries, key=lambda key: self._entries[key][0])
+                del self._entries[oldest]
+            self._entries[host_key(url)] = (time.time(), decision)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
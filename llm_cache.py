@@ -0,0 +1,163 @@
+"""
+Persistent cache of LLM chat completions.
+
+Summaries and link selection send a prompt that is fully determined by the
+input text and a fixed system prompt, so a repeat run can reuse the stored
+response instead of another round trip. Entries are keyed by model, prompt
+template version, a hash of the messages and the sampling parameters, and
+live in one SQLite file that is trimmed least-recently-used first once it
+grows past its size bound.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+
+DEFAULT_PATH = "llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 10000
+
+
+def messages_hash(messages) -> str:
+    return hashlib.sha256(json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def cache_key(model: str, template_version: str, messages, params: Dict[str, Any]) -> str:
+    """Stable key of one request: model, prompt template version, messages hash and sampling parameters"""
+    payload = {
+        "model": model,
+        "template_version": template_version,
+        "messages": messages_hash(messages),
+        "params": params,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    SQLite-backed response store shared by threads and processes. cache_sampled
+    controls whether responses requested with a non-zero temperature are cached;
+    a call can override it, e.g. when every run should get a fresh sample.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, cache_sampled: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.cache_sampled = cache_sampled
+        self.stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self.connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT, template_version TEXT, content TEXT,"
+                " size INTEGER, created REAL, last_used REAL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    @contextmanager
+    def connect(self):
+        # One short-lived connection per operation keeps the cache safe to use from any thread
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def get(self, key: str):
+        with self.connect() as connection:
+            row = connection.execute("SELECT content FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.count("hits" if row is not None else "misses")
+        return row[0] if row is not None else None
+
+    def put(self, key: str, content: str, model: str = None, template_version: str = None):
+        now = time.time()
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, model, template_version, content, len(content.encode("utf-8")), now, now),
+            )
+            self.evict(connection)
+
+    def evict(self, connection):
+        """Drop least recently used entries beyond max_entries or max_bytes"""
+        connection.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM ("
+            "  SELECT key,"
+            "   SUM(size) OVER (ORDER BY last_used DESC, rowid DESC) AS running_size,"
+            "   ROW_NUMBER() OVER (ORDER BY last_used DESC, rowid DESC) AS position"
+            "  FROM responses)"
+            " WHERE running_size > ? OR position > ?)",
+            (self.max_bytes, self.max_entries),
+        )
+
+    def clear(self):
+        with self.connect() as connection:
+            connection.execute("DELETE FROM responses")
+
+    def count(self, counter: str):
+        with self.stats_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters of this process and the current size of the store"""
+        with self.connect() as connection:
+            entries, size = connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self.stats_lock:
+            return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed,
+                    "entries": entries, "bytes": size}
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> LLMResponseCache:
+    """Process-wide cache at DEFAULT_PATH, created on first use"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
+
+
+def cached_chat_completion(create, *, template_version: str, cache: LLMResponseCache = None,
+                           cache_sampled: bool = None, **request) -> str:
+    """
+    Call create(**request) (e.g. client.chat.completions.create) through the
+    response cache and return the message content. Bump template_version
+    whenever the prompt wording changes so old responses are not reused.
+    """
+    cache = cache or get_response_cache()
+    if cache_sampled is None:
+        cache_sampled = cache.cache_sampled
+    # The API samples at temperature 1 when none is given
+    if not cache_sampled and request.get("temperature", 1) != 0:
+        cache.count("bypassed")
+        return create(**request).choices[0].message.content
+
+    model = request.get("model")
+    messages = request.get("messages", [])
+    params = {name: value for name, value in request.items() if name not in ("model", "messages")}
+    key = cache_key(model, template_version, messages, params)
+    content = cache.get(key)
+    if content is None:
+        content = create(**request).choices[0].message.content
+        if content is not None:
+            cache.put(key, content, model=model, template_version=template_version)
+    return content
@@ -0,0 +1,167 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.schema import SystemMessage, get_buffer_string
+
+
+SUMMARY_PROMPT = """Progressively summarize the lines of conversation provided, adding onto the previous summary and returning a new summary.
+Keep names, numbers and any facts the user asked about. Write the summary in the same language as the conversation.
+
+Current summary:
+{summary}
+
+New lines of conversation:
+{new_lines}
+
+New summary:"""
+
+# One background worker is enough: summaries are small and must be applied in order.
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-summary")
+
+# History metrics per memory_id, updated by every RollingSummaryMemory instance.
+# The processors each own one memory ("video", "website", "document"), so in the
+# Streamlit app, where processors are shared by all browser sessions, these are
+# per-processor totals rather than per-user figures.
+_metrics_lock = threading.Lock()
+_memory_metrics: Dict[str, Dict[str, int]] = {}
+
+
+def get_memory_metrics(memory_id: str = None) -> Dict[str, Any]:
+    """Return history size metrics for one memory, or for all memories"""
+    with _metrics_lock:
+        if memory_id is not None:
+            return dict(_memory_metrics.get(memory_id, {}))
+        return {key: dict(value) for key, value in _memory_metrics.items()}
+
+
+class RollingSummaryMemory(BaseChatMemory):
+    """
+    Chat memory with a token budget: the last turns are kept verbatim and
+    older turns are folded into a running summary by a background worker
+    """
+
+    llm: Any
+    memory_id: str = "default"
+    memory_key: str = "chat_history"
+    return_messages: bool = True
+    max_token_limit: int = 1500
+    keep_last_turns: int = 4
+    summary: str = ""
+    # Turns already evicted from the buffer but not yet folded into the summary
+    pending_messages: List[Any] = []
+    summarized_turns: int = 0
+    # Turns discarded unsummarized because summarizing kept failing
+    dropped_turns: int = 0
+    # Bumped by clear() so an in-flight summary is not applied to a cleared memory
+    generation: int = 0
+    lock: Any = None
+    summary_future: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.RLock()
+        self.pending_messages = []
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def count_tokens(self, messages) -> int:
+        if not messages:
+            return 0
+        try:
+            return self.llm.get_num_tokens_from_messages(messages)
+        except Exception:
+            # Rough estimate when the tokenizer is unavailable
+            return len(get_buffer_string(messages)) // 4
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            messages = []
+            if self.summary:
+                messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self.summary}"))
+            messages.extend(self.pending_messages)
+            messages.extend(self.chat_memory.messages)
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: get_buffer_string(messages, human_prefix=self.human_prefix, ai_prefix=self.ai_prefix)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        super().save_context(inputs, outputs)
+        with self.lock:
+            self.prune()
+            self.update_metrics()
+
+    def prune(self):
+        """Move turns over the budget out of the buffer and schedule a summary update"""
+        buffer = self.chat_memory.messages
+        keep = max(self.keep_last_turns, 1) * 2
+        evicted = []
+        while len(buffer) > keep or (len(buffer) > 2 and self.count_tokens(buffer) > self.max_token_limit):
+            evicted.extend(buffer[:2])
+            buffer = buffer[2:]
+        if evicted:
+            self.chat_memory.messages = buffer
+            self.pending_messages.extend(evicted)
+        # Hard cap: if the summary keeps failing, the oldest unsummarized turns are dropped
+        # rather than replayed forever
+        while len(self.pending_messages) > 2 and self.count_tokens(self.pending_messages) > self.max_token_limit:
+            self.pending_messages = self.pending_messages[2:]
+            self.dropped_turns += 1
+        if self.pending_messages and (self.summary_future is None or self.summary_future.done()):
+            self.summary_future = _summary_executor.submit(self.fold_pending)
+
+    def fold_pending(self):
+        """Fold pending turns into the running summary, off the request path"""
+        while True:
+            with self.lock:
+                batch = list(self.pending_messages)
+                summary = self.summary
+                generation = self.generation
+            if not batch:
+                return
+            prompt = SUMMARY_PROMPT.format(summary=summary or "(empty)", new_lines=get_buffer_string(batch))
+            try:
+                new_summary = self.llm.invoke(prompt).content
+            except Exception:
+                # Keep the turns verbatim; they are retried on the next prune
+                return
+            with self.lock:
+                if self.generation != generation:
+                    return
+                # Only drop what was summarized; prune() may have dropped or added turns meanwhile
+                folded = {id(message) for message in batch}
+                self.pending_messages = [message for message in self.pending_messages if id(message) not in folded]
+                self.summary = new_summary.strip()
+                self.summarized_turns += len(batch) // 2
+                self.update_metrics()
+
+    def update_metrics(self):
+        buffer = self.chat_memory.messages
+        summary_tokens = self.count_tokens([SystemMessage(content=self.summary)]) if self.summary else 0
+        verbatim_tokens = self.count_tokens(list(self.pending_messages) + list(buffer))
+        with _metrics_lock:
+            _memory_metrics[self.memory_id] = {
+                "verbatim_turns": len(buffer) // 2,
+                "pending_turns": len(self.pending_messages) // 2,
+                "summarized_turns": self.summarized_turns,
+                "dropped_turns": self.dropped_turns,
+                "summary_tokens": summary_tokens,
+                "history_tokens": summary_tokens + verbatim_tokens,
+            }
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Return history size metrics for this memory"""
+        return get_memory_metrics(self.memory_id)
+
+    def clear(self) -> None:
+        with self.lock:
+            super().clear()
+            self.summary = ""
+            self.pending_messages = []
+            self.summarized_turns = 0
+            self.dropped_turns = 0
+            self.generation += 1
+            self.update_metrics()
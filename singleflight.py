@@ -0,0 +1,259 @@
+"""
+Single-flight coordination of ingest jobs.
+
+Concurrent requests for the same source (same video id, normalized URL or
+file hash) attach to one running job and all receive its result. Within a
+server process this uses futures; across processes a lock file per
+fingerprint serializes the work and the finished result is shared on disk as
+JSON, in an app-owned directory only the server's user can access.
+"""
+import glob
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from concurrent.futures import Future
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+DEFAULT_ROOT = "ingest_results"
+RESULT_TTL_SECONDS = 6 * 3600
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form of a URL: lower-case host without www, no fragment, sorted query, no trailing slash"""
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or "http").lower()
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parsed.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parsed.query, keep_blank_values=True)))
+    return f"{scheme}://{host}{path}" + (f"?{query}" if query else "")
+
+
+def url_fingerprint(url: str) -> str:
+    return "url-" + hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()[:32]
+
+
+def video_fingerprint(video_id: str) -> str:
+    return "video-" + hashlib.sha256(video_id.encode("utf-8")).hexdigest()[:32]
+
+
+def file_fingerprint(source) -> str:
+    """
+    Hash a path, buffer or file-like object (e.g. a Streamlit upload) without copying it.
+    Generic streams must be seekable; see docs_module.buffer_source for one-pass streams.
+    """
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        digest.update(source)
+    elif hasattr(source, "getbuffer"):
+        with source.getbuffer() as view:
+            digest.update(view)
+    else:
+        position = source.tell()
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+        source.seek(position)
+    return digest_fingerprint(digest)
+
+
+def digest_fingerprint(digest) -> str:
+    """File fingerprint from a sha256 object fed with the file's bytes, e.g. while buffering a stream"""
+    return "file-" + digest.hexdigest()[:32]
+
+
+def files_fingerprint(sources) -> str:
+    """Fingerprint of a document collection, independent of upload order"""
+    return collection_fingerprint(file_fingerprint(source) for source in sources)
+
+
+def collection_fingerprint(fingerprints) -> str:
+    """Combine already computed file fingerprints the same way files_fingerprint does"""
+    parts = sorted(fingerprints)
+    return "files-" + hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:32]
+
+
+class FileLock:
+    """Exclusive inter-process lock held on a lock file for the duration of a with-block"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.path, "a+b")
+        if fcntl is not None:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self.file.seek(0)
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.1)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+
+def ensure_private_directory(path: str):
+    """Create path with mode 0o700, or check that an existing one is ours and tighten it"""
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        raise PermissionError(f"{path} is owned by another user; refusing to share results through it")
+    if stat.S_IMODE(info.st_mode) & 0o077:
+        os.chmod(path, 0o700)
+
+
+class SingleFlight:
+    """
+    Run at most one job per fingerprint at a time, in this process and across
+    processes sharing the same root directory, and share the finished result.
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, result_ttl: float = RESULT_TTL_SECONDS, max_results: int = 64):
+        self.root = root
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._results = {}
+        self.stats = {"leader": 0, "attached": 0, "memory_hits": 0, "disk_hits": 0}
+        ensure_private_directory(self.root)
+
+    def _result_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.result")
+
+    def _lock_path(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.lock")
+
+    def artifact_path(self, key: str, suffix: str) -> str:
+        """
+        Path for a file that belongs to key's result (e.g. a knowledge pack with the
+        built index); it is removed together with the result when that expires
+        """
+        return os.path.join(self.root, f"{key}.artifact{suffix}")
+
+    def _remove_result(self, key: str):
+        for path in [self._result_path(key)] + glob.glob(os.path.join(self.root, f"{glob.escape(key)}.artifact*")):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _load_result(self, key: str):
+        path = self._result_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.result_ttl:
+                self._remove_result(key)
+                return None
+            with open(path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def _store_result(self, key: str, result):
+        path = self._result_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(result, file, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            # Results that cannot be written are still shared in-process
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def do(self, key: str, fn, on_shared=None, cache_if=None):
+        """
+        Return fn()'s result for key, running fn at most once across concurrent callers.
+
+        on_shared(result) is called whenever this caller did not run fn itself (it
+        attached to a running job, or the result came from memory or from another
+        process on disk), so the caller can make sure process-local state such as
+        an index matches the result.
+        cache_if(result) decides whether a result is kept for later callers; failed
+        jobs (exceptions) are never cached.
+        """
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and time.time() - cached[0] > self.result_ttl:
+                self._results.pop(key, None)
+                cached = None
+            future = self._inflight.get(key) if cached is None else None
+            leader = future is None and cached is None
+            if cached is not None:
+                self.stats["memory_hits"] += 1
+            elif leader:
+                future = Future()
+                self._inflight[key] = future
+                self.stats["leader"] += 1
+            else:
+                self.stats["attached"] += 1
+        if cached is not None:
+            return self._shared(cached[1], on_shared)
+        if not leader:
+            return self._shared(future.result(), on_shared)
+
+        try:
+            with FileLock(self._lock_path(key)):
+                result = self._load_result(key)
+                if result is not None:
+                    self.stats["disk_hits"] += 1
+                    self._shared(result, on_shared)
+                else:
+                    result = fn()
+                    if cache_if is None or cache_if(result):
+                        self._store_result(key, result)
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if cache_if is None or cache_if(result):
+                if len(self._results) >= self.max_results:
+                    oldest = min(self._results, key=lambda k: self._results[k][0])
+                    del self._results[oldest]
+                self._results[key] = (time.time(), result)
+        future.set_result(result)
+        return result
+
+    @staticmethod
+    def _shared(result, on_shared):
+        if on_shared is not None:
+            on_shared(result)
+        return result
+
+    def forget(self, key: str):
+        """Drop a shared result so the next request runs the job again"""
+        with self._lock:
+            self._results.pop(key, None)
+        self._remove_result(key)
@@ -3,7 +3,7 @@ import os
 from video_module import YouTubeProcessor
 from webscrape_module import WebsiteProcess
 from docs_module import DocumentProcessor
-import tempfile
+from singleflight import SingleFlight, collection_fingerprint, file_fingerprint, url_fingerprint, video_fingerprint
 
 # Page config
 st.set_page_config(
@@ -24,6 +24,52 @@ def get_processors():
 
 processors = get_processors()
 
+# Shared by every session in this server process; the lock files also cover other processes
+@st.cache_resource
+def get_ingest_flight():
+    return SingleFlight(), {}
+
+ingest_flight, loaded_sources = get_ingest_flight()
+
+def run_ingest(kind, key, job, cache_if=None):
+    """
+    Run an ingest job once per source fingerprint. Identical concurrent requests
+    attach to the running job. The leader also saves its index as a knowledge pack
+    next to the shared result, so a caller that reuses the result (here or in
+    another process) memory-maps the same chunks, vectors and metadata instead of
+    embedding the text again.
+    """
+    processor = processors[kind]
+    pack_path = ingest_flight.artifact_path(key, ".kpack")
+
+    def leader_job():
+        result = job()
+        loaded_sources[kind] = key
+        if cache_if is None or cache_if(result):
+            try:
+                processor.export_knowledge_pack(pack_path)
+            except Exception:
+                # Without a pack, callers reusing the result fall back to running the job
+                pass
+        return result
+
+    def ensure_loaded(result):
+        if loaded_sources.get(kind) != key:
+            if os.path.exists(pack_path):
+                processor.load_knowledge_pack(pack_path)
+            else:
+                job()
+            loaded_sources[kind] = key
+
+    return ingest_flight.do(key, leader_job, on_shared=ensure_loaded, cache_if=cache_if)
+
+def succeeded(result):
+    """
+    Only fully successful results are shared. A status "... processed with errors: ..."
+    (failed files or summary) is shown but not cached, so the next request retries it.
+    """
+    return result[2].endswith("processed successfully!")
+
 # Initialize session state for chat histories
 if 'video_chat_history' not in st.session_state:
     st.session_state.video_chat_history = []
@@ -32,6 +78,87 @@ if 'website_chat_history' not in st.session_state:
 if 'document_chat_history' not in st.session_state:
     st.session_state.document_chat_history = []
 
+# Large texts are shown one page at a time so reruns don't resend the whole transcript
+TEXT_PAGE_CHARS = 20000
+# Only the most recent chat messages are rendered until the user asks for more
+CHAT_WINDOW = 40
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def split_text_pages(text, page_chars=TEXT_PAGE_CHARS):
+    """Split text into pages of roughly page_chars characters, breaking at line ends"""
+    pages = []
+    start = 0
+    while start < len(text):
+        end = min(start + page_chars, len(text))
+        if end < len(text):
+            newline = text.rfind("\n", start, end)
+            if newline > start:
+                end = newline + 1
+        pages.append(text[start:end])
+        start = end
+    return pages or [""]
+
+@st.fragment
+def render_text_view(label, text, key, height=300):
+    """Paginated read-only view of a large text; paging reruns only this fragment"""
+    pages = split_text_pages(text)
+    page = 1
+    if len(pages) > 1:
+        page = st.number_input(f"{label} page", min_value=1, max_value=len(pages), value=1, key=f"{key}_page")
+        st.caption(f"Page {page} of {len(pages)} · {len(text):,} characters")
+    st.text_area(label, value=pages[page - 1], height=height, disabled=len(pages) > 1, key=f"{key}_{page}")
+    if len(pages) > 1:
+        st.download_button(f"⬇️ Download full {label.lower()}", data=text, file_name=f"{key}.txt", key=f"{key}_download")
+
+@st.fragment
+def render_chat(history_key, prefix, input_label, placeholder, is_ready, ask, reset, not_ready_message):
+    """
+    Chat panel rendered as a fragment: sending a message only reruns this panel
+    and appends the new messages instead of re-rendering the whole app.
+    """
+    col1, col2 = st.columns([4, 1])
+    
+    with col2:
+        reset_btn = st.button("🔄 Reset Conversation", key=f"reset_{prefix}")
+        if reset_btn:
+            st.session_state[history_key] = []
+            reset()
+            st.success("✅ Conversation reset!")
+    
+    with col1:
+        history = st.session_state[history_key]
+        history_box = st.container(height=400)
+        with history_box:
+            shown = history if st.session_state.get(f"{prefix}_show_all") else history[-CHAT_WINDOW:]
+            if len(shown) < len(history):
+                if st.button(f"Show {len(history) - len(shown)} earlier messages", key=f"{prefix}_show_all_btn"):
+                    st.session_state[f"{prefix}_show_all"] = True
+                    st.rerun(scope="fragment")
+            for message in shown:
+                with st.chat_message(message['role']):
+                    st.markdown(message['content'])
+        
+        # Chat input
+        question = st.text_input(input_label, placeholder=placeholder, key=f"{prefix}_chat_input")
+        
+        col_send, col_clear = st.columns([1, 4])
+        with col_send:
+            send_btn = st.button("📤 Send", type="primary", key=f"send_{prefix}")
+    
+        if send_btn and question:
+            if is_ready():
+                with history_box:
+                    with st.chat_message("user"):
+                        st.markdown(question)
+                    with st.chat_message("assistant"):
+                        with st.spinner("Thinking..."):
+                            response = ask(question)
+                        st.markdown(response)
+                history.append({'role': 'user', 'content': question})
+                history.append({'role': 'assistant', 'content': response})
+            else:
+                st.error(not_ready_message)
+
 # Custom CSS for better styling
 st.markdown("""
 <style>
@@ -60,14 +187,6 @@ st.markdown("""
         border-radius: 0.25rem;
         border: 1px solid #f5c6cb;
     }
-    .chat-container {
-        max-height: 400px;
-        overflow-y: auto;
-        padding: 1rem;
-        border: 1px solid #dee2e6;
-        border-radius: 0.5rem;
-        background-color: #f8f9fa;
-    }
 </style>
 """, unsafe_allow_html=True)
 
@@ -93,7 +212,7 @@ with tab1:
     with col1:
         url_input = st.text_input(
             "YouTube URL",
-            placeholder="https://www.youtube.com/watch?v=...",
+            placeholder="https://www.youtube.com/watch?v=... or a playlist/channel URL",
             key="video_url"
         )
         process_video_btn = st.button("🎬 Process Video", type="primary", key="process_video")
@@ -105,7 +224,25 @@ with tab1:
         with status_container:
             with st.spinner("Processing video..."):
                 try:
-                    result = processors['youtube'].process_video(url_input)
+                    if processors['youtube'].is_collection_url(url_input):
+                        progress_bar = st.progress(0.0, text="Listing playlist videos...")
+                        result = run_ingest(
+                            'youtube', url_fingerprint(url_input),
+                            lambda: processors['youtube'].process_playlist(
+                                url_input, progress_callback=lambda fraction, message: progress_bar.progress(fraction, text=message)
+                            ),
+                            # Partial results are not shared, so the next request resumes the missing videos
+                            cache_if=lambda playlist: all(video['status'] == 'done' for video in playlist['videos'])
+                        )
+                        failed = [video for video in result['videos'] if video['status'] != 'done']
+                        if failed:
+                            st.warning(f"⚠️ {len(failed)} of {len(result['videos'])} videos failed; process the playlist again to resume them.")
+                    else:
+                        video_key = video_fingerprint(processors['youtube'].extract_video_id(url_input))
+                        result = run_ingest(
+                            'youtube', video_key,
+                            lambda: processors['youtube'].process_video(url_input)
+                        )
                     st.success("✅ Video processed successfully!")
                     
                     # Store results in session state
@@ -120,64 +257,25 @@ with tab1:
         col3, col4 = st.columns(2)
         
         with col3:
-            st.text_area(
-                "Full Transcript",
-                value=st.session_state.video_transcript,
-                height=300,
-                key="transcript_display"
-            )
+            render_text_view("Full Transcript", st.session_state.video_transcript, key="transcript_display")
         
         with col4:
-            st.text_area(
-                "Summary",
-                value=st.session_state.video_summary,
-                height=300,
-                key="summary_display"
-            )
+            render_text_view("Summary", st.session_state.video_summary, key="summary_display")
 
 # Tab 2: Chat with Video
 with tab2:
     st.markdown('<h3 class="tab-header">💬 Have a conversation with the video content</h3>', unsafe_allow_html=True)
     
-    col1, col2 = st.columns([4, 1])
-    
-    with col1:
-        # Display chat history
-        st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-        for message in st.session_state.video_chat_history:
-            if message['role'] == 'user':
-                st.markdown(f"**You:** {message['content']}")
-            else:
-                st.markdown(f"**AI:** {message['content']}")
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Chat input
-        video_question = st.text_input(
-            "Ask a question about the video",
-            placeholder="What is this video about?",
-            key="video_chat_input"
-        )
-        
-        col_send, col_clear = st.columns([1, 4])
-        with col_send:
-            send_video_btn = st.button("📤 Send", type="primary", key="send_video")
-    
-    with col2:
-        reset_video_btn = st.button("🔄 Reset Conversation", key="reset_video")
-        if reset_video_btn:
-            st.session_state.video_chat_history = []
-            processors['youtube'].reset_conversation()
-            st.success("✅ Conversation reset!")
-    
-    if send_video_btn and video_question:
-        if hasattr(processors['youtube'], 'conversation_chain') and processors['youtube'].conversation_chain:
-            with st.spinner("Thinking..."):
-                response = processors['youtube'].chat_with_video(video_question)
-                st.session_state.video_chat_history.append({'role': 'user', 'content': video_question})
-                st.session_state.video_chat_history.append({'role': 'assistant', 'content': response})
-                st.rerun()
-        else:
-            st.error("❌ Please process a video first!")
+    render_chat(
+        "video_chat_history",
+        "video",
+        "Ask a question about the video",
+        "What is this video about?",
+        is_ready=lambda: bool(processors['youtube'].conversation_chain),
+        ask=processors['youtube'].chat_with_video,
+        reset=processors['youtube'].reset_conversation,
+        not_ready_message="❌ Please process a video first!"
+    )
 
 # Tab 3: Process Website
 with tab3:
@@ -200,9 +298,16 @@ with tab3:
         with web_status_container:
             with st.spinner("Processing website..."):
                 try:
-                    text, summary, status = processors['website'].process_website(url_web_input)
-                    if "successfully" in status:
-                        st.success("✅ Website processed successfully!")
+                    text, summary, status = run_ingest(
+                        'website', url_fingerprint(url_web_input),
+                        lambda: processors['website'].process_website(url_web_input),
+                        cache_if=succeeded
+                    )
+                    if text:
+                        if succeeded((text, summary, status)):
+                            st.success("✅ Website processed successfully!")
+                        else:
+                            st.warning(f"⚠️ {status}")
                         st.session_state.website_text = text
                         st.session_state.website_summary = summary
                     else:
@@ -215,64 +320,25 @@ with tab3:
         col3, col4 = st.columns(2)
         
         with col3:
-            st.text_area(
-                "Website Content",
-                value=st.session_state.website_text,
-                height=300,
-                key="website_content_display"
-            )
+            render_text_view("Website Content", st.session_state.website_text, key="website_content_display")
         
         with col4:
-            st.text_area(
-                "Summary",
-                value=st.session_state.website_summary,
-                height=300,
-                key="website_summary_display"
-            )
+            render_text_view("Summary", st.session_state.website_summary, key="website_summary_display")
 
 # Tab 4: Chat with Website
 with tab4:
     st.markdown('<h3 class="tab-header">🗨️ Have a conversation with the website content</h3>', unsafe_allow_html=True)
     
-    col1, col2 = st.columns([4, 1])
-    
-    with col1:
-        # Display chat history
-        st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-        for message in st.session_state.website_chat_history:
-            if message['role'] == 'user':
-                st.markdown(f"**You:** {message['content']}")
-            else:
-                st.markdown(f"**AI:** {message['content']}")
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Chat input
-        website_question = st.text_input(
-            "Ask a question about the website",
-            placeholder="What is this website about?",
-            key="website_chat_input"
-        )
-        
-        col_send, col_clear = st.columns([1, 4])
-        with col_send:
-            send_web_btn = st.button("📤 Send", type="primary", key="send_website")
-    
-    with col2:
-        reset_web_btn = st.button("🔄 Reset Conversation", key="reset_website")
-        if reset_web_btn:
-            st.session_state.website_chat_history = []
-            processors['website'].reset_website_conversation()
-            st.success("✅ Conversation reset!")
-    
-    if send_web_btn and website_question:
-        if hasattr(processors['website'], 'conversation_chain') and processors['website'].conversation_chain:
-            with st.spinner("Thinking..."):
-                response = processors['website'].chat_with_website_content(website_question)
-                st.session_state.website_chat_history.append({'role': 'user', 'content': website_question})
-                st.session_state.website_chat_history.append({'role': 'assistant', 'content': response})
-                st.rerun()
-        else:
-            st.error("❌ Please process a website first!")
+    render_chat(
+        "website_chat_history",
+        "website",
+        "Ask a question about the website",
+        "What is this website about?",
+        is_ready=lambda: bool(processors['website'].conversation_chain),
+        ask=processors['website'].chat_with_website_content,
+        reset=processors['website'].reset_website_conversation,
+        not_ready_message="❌ Please process a website first!"
+    )
 
 # Tab 5: Process Document
 with tab5:
@@ -281,34 +347,51 @@ with tab5:
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        uploaded_file = st.file_uploader(
-            "Upload Document",
+        uploaded_files = st.file_uploader(
+            "Upload Documents",
             type=['pdf', 'docx', 'txt'],
+            accept_multiple_files=True,
             key="document_upload"
         )
-        process_doc_btn = st.button("📄 Process Document", type="primary", key="process_document")
+        process_doc_btn = st.button("📄 Process Documents", type="primary", key="process_document")
     
     with col2:
         doc_status_container = st.container()
     
-    if process_doc_btn and uploaded_file:
+    if process_doc_btn and uploaded_files:
         with doc_status_container:
-            with st.spinner("Processing document..."):
+            with st.spinner(f"Processing {len(uploaded_files)} document(s)..."):
                 try:
-                    # Save uploaded file temporarily
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{uploaded_file.name.split('.')[-1]}") as tmp_file:
-                        tmp_file.write(uploaded_file.getvalue())
-                        tmp_file_path = tmp_file.name
-                    
-                    text, summary, status = processors['document'].process_document(tmp_file_path)
-                    
-                    # Clean up temp file
-                    os.unlink(tmp_file_path)
+                    # Uploads are passed straight to the extractors; no temp file copy
+                    # Each upload is hashed once; the processors reuse these fingerprints for checkpoints
+                    if len(uploaded_files) == 1:
+                        document_key = file_fingerprint(uploaded_files[0])
+                        document_job = lambda: processors['document'].process_document(
+                            uploaded_files[0], filename=uploaded_files[0].name, fingerprint=document_key
+                        )
+                    else:
+                        upload_fingerprints = [file_fingerprint(uploaded_file) for uploaded_file in uploaded_files]
+                        document_key = collection_fingerprint(upload_fingerprints)
+                        document_job = lambda: processors['document'].process_documents(
+                            uploaded_files, names=[uploaded_file.name for uploaded_file in uploaded_files],
+                            fingerprints=upload_fingerprints
+                        )
+                    text, summary, status = run_ingest(
+                        'document', document_key, document_job,
+                        cache_if=succeeded
+                    )
                     
-                    if "successfully" in status:
-                        st.success("✅ Document processed successfully!")
+                    if text:
+                        if succeeded((text, summary, status)):
+                            st.success(f"✅ {status}")
+                        else:
+                            st.warning(f"⚠️ {status}")
                         st.session_state.document_text = text
                         st.session_state.document_summary = summary
+                        stats = processors['document'].collection_stats
+                        if len(uploaded_files) > 1 and stats:
+                            st.caption(f"{stats['files']} files, {stats['chunks']} chunks, "
+                                       f"{stats['mb_per_second']:.1f} MB/s extraction with {stats['workers']} workers")
                     else:
                         st.error(f"❌ {status}")
                 except Exception as e:
@@ -319,64 +402,25 @@ with tab5:
         col3, col4 = st.columns(2)
         
         with col3:
-            st.text_area(
-                "Document Text",
-                value=st.session_state.document_text,
-                height=300,
-                key="document_text_display"
-            )
+            render_text_view("Document Text", st.session_state.document_text, key="document_text_display")
         
         with col4:
-            st.text_area(
-                "Document Summary",
-                value=st.session_state.document_summary,
-                height=300,
-                key="document_summary_display"
-            )
+            render_text_view("Document Summary", st.session_state.document_summary, key="document_summary_display")
 
 # Tab 6: Chat with Document
 with tab6:
     st.markdown('<h3 class="tab-header">📝 Have a conversation with the document content</h3>', unsafe_allow_html=True)
     
-    col1, col2 = st.columns([4, 1])
-    
-    with col1:
-        # Display chat history
-        st.markdown('<div class="chat-container">', unsafe_allow_html=True)
-        for message in st.session_state.document_chat_history:
-            if message['role'] == 'user':
-                st.markdown(f"**You:** {message['content']}")
-            else:
-                st.markdown(f"**AI:** {message['content']}")
-        st.markdown('</div>', unsafe_allow_html=True)
-        
-        # Chat input
-        document_question = st.text_input(
-            "Ask a question about the document",
-            placeholder="What is this document about?",
-            key="document_chat_input"
-        )
-        
-        col_send, col_clear = st.columns([1, 4])
-        with col_send:
-            send_doc_btn = st.button("📤 Send", type="primary", key="send_document")
-    
-    with col2:
-        reset_doc_btn = st.button("🔄 Reset Conversation", key="reset_document")
-        if reset_doc_btn:
-            st.session_state.document_chat_history = []
-            processors['document'].reset_document_conversation()
-            st.success("✅ Conversation reset!")
-    
-    if send_doc_btn and document_question:
-        if hasattr(processors['document'], 'document_conversation_chain') and processors['document'].document_conversation_chain:
-            with st.spinner("Thinking..."):
-                response = processors['document'].chat_with_document(document_question)
-                st.session_state.document_chat_history.append({'role': 'user', 'content': document_question})
-                st.session_state.document_chat_history.append({'role': 'assistant', 'content': response})
-                st.rerun()
-        else:
-            st.error("❌ Please process a document first!")
+    render_chat(
+        "document_chat_history",
+        "document",
+        "Ask a question about the document",
+        "What is this document about?",
+        is_ready=lambda: bool(processors['document'].document_conversation_chain),
+        ask=processors['document'].chat_with_document,
+        reset=processors['document'].reset_document_conversation,
+        not_ready_message="❌ Please process a document first!"
+    )
 
 # Sidebar with information
 with st.sidebar:
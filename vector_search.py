@@ -0,0 +1,111 @@
+"""
+Batched similarity search and vectorized MMR re-ranking.
+
+Works on a LangChain FAISS store or a memory-mapped KnowledgePack: all query
+embeddings are requested in one call, the index is searched once with the
+whole query matrix, and MMR runs over every query at once on cached chunk
+vectors instead of one query at a time.
+"""
+import threading
+import weakref
+from typing import List
+
+import numpy as np
+
+from knowledge_pack import KnowledgePack
+
+
+_vector_cache = weakref.WeakKeyDictionary()
+_vector_cache_lock = threading.Lock()
+
+
+def cached_vectors(vector_store) -> np.ndarray:
+    """All vectors of a FAISS store as one float32 matrix, reconstructed once per index size"""
+    if isinstance(vector_store, KnowledgePack):
+        return vector_store.vectors
+    index = vector_store.index
+    with _vector_cache_lock:
+        cached = _vector_cache.get(vector_store)
+        if cached is not None and cached[0] == index.ntotal:
+            return cached[1]
+    vectors = np.ascontiguousarray(index.reconstruct_n(0, index.ntotal), dtype=np.float32)
+    with _vector_cache_lock:
+        _vector_cache[vector_store] = (index.ntotal, vectors)
+    return vectors
+
+
+def search_matrix(vector_store, query_vectors: np.ndarray, k: int):
+    """One index search for a whole (n_queries, dim) matrix; returns (distances, indices) with -1 padding"""
+    if isinstance(vector_store, KnowledgePack):
+        return vector_store.search_batch(query_vectors, k)
+    return vector_store.index.search(np.ascontiguousarray(query_vectors, dtype=np.float32), k)
+
+
+def get_document(vector_store, position: int):
+    if isinstance(vector_store, KnowledgePack):
+        return vector_store.document(position)
+    return vector_store.docstore.search(vector_store.index_to_docstore_id[position])
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def mmr_rerank(query_vectors: np.ndarray, candidate_vectors: np.ndarray, candidate_mask: np.ndarray,
+               k: int, lambda_mult: float = 0.5) -> np.ndarray:
+    """
+    Maximal marginal relevance for a batch of queries at once.
+
+    query_vectors is (n, dim), candidate_vectors (n, fetch_k, dim) and
+    candidate_mask (n, fetch_k) marks real candidates. Returns (n, k) positions
+    into the candidate axis, -1 where a query ran out of candidates.
+    """
+    queries = _normalize(query_vectors.astype(np.float32))
+    candidates = _normalize(candidate_vectors.astype(np.float32))
+    relevance = np.einsum("nfd,nd->nf", candidates, queries)
+    similarity = np.einsum("nfd,ngd->nfg", candidates, candidates)
+
+    rows = np.arange(len(queries))
+    available = candidate_mask.copy()
+    redundancy = np.zeros_like(relevance)
+    selected = np.full((len(queries), k), -1, dtype=np.int64)
+    for step in range(k):
+        scores = relevance if step == 0 else lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores = np.where(available, scores, -np.inf)
+        picks = np.argmax(scores, axis=1)
+        valid = available[rows, picks]
+        selected[:, step] = np.where(valid, picks, -1)
+        available[rows, picks] = False
+        picked_similarity = similarity[rows, picks, :]
+        redundancy = picked_similarity if step == 0 else np.maximum(redundancy, picked_similarity)
+    return selected
+
+
+def batch_search(vector_store, embeddings, queries: List[str], k: int = 4, fetch_k: int = 20,
+                 mmr: bool = False, lambda_mult: float = 0.5, query_vectors=None):
+    """
+    Search many queries with one embedding call and one matrix search.
+    Returns one list of LangChain Documents per query. With mmr=True the top
+    fetch_k hits per query are re-ranked for diversity down to k.
+    """
+    if not queries:
+        return []
+    if query_vectors is None:
+        query_vectors = embeddings.embed_documents(list(queries))
+    query_vectors = np.asarray(query_vectors, dtype=np.float32)
+
+    fetch = max(fetch_k, k) if mmr else k
+    _, indices = search_matrix(vector_store, query_vectors, fetch)
+    if mmr:
+        vectors = cached_vectors(vector_store)
+        mask = indices >= 0
+        candidates = vectors[np.where(mask, indices, 0)]
+        picks = mmr_rerank(query_vectors, candidates, mask, k, lambda_mult)
+        rows = np.arange(len(indices))[:, None]
+        indices = np.where(picks >= 0, indices[rows, np.maximum(picks, 0)], -1)
+
+    results = []
+    for row in indices:
+        results.append([get_document(vector_store, int(position)) for position in row if position >= 0])
+    return results
@@ -1,4 +1,8 @@
 import os
+import glob
+import json
+import subprocess
+import threading
 import yt_dlp
 import openai
 from dotenv import load_dotenv
@@ -7,22 +11,48 @@ from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
+from memory_module import RollingSummaryMemory
+from chat_module import FastRetrievalChat
+from checkpoints import CheckpointStore, faiss_from_documents_with_checkpoints, gc_checkpoints
+from singleflight import video_fingerprint
+from llm_cache import cached_chat_completion
+from knowledge_pack import KnowledgePack, KnowledgePackRetriever, faiss_contents, write_knowledge_pack
+import vector_search
 
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+PLAYLIST_STATE_DIR = "playlist_state"
+COLLECTION_URL_PATTERN = re.compile(
+    r'(?:https?:\/\/)?(?:www\.|m\.)?youtube\.com\/(?:playlist\?|channel\/|c\/|user\/|@)'
+)
+
 class YouTubeProcessor:
     def __init__(self):
         self.embeddings = None
         self.vector_store = None
         self.conversation_chain = None
         self.memory = None
+        self.knowledge_pack = None
+        self.video_id = None
+        self.transcript = None
+        self.summary = None
         self.MODEL = "gpt-4o-mini"
+        # "fast" answers with one LLM call when the question needs no condensing; "chain" uses ConversationalRetrievalChain
+        self.CHAT_MODE = "fast"
         self.AUDIO_MODEL = "whisper-1"
+        # Bump when the summary prompt changes so cached summaries are not reused
+        self.SUMMARY_TEMPLATE_VERSION = "video-summary-v1"
+        # Transcription unit: a failure only loses the segment in flight
+        self.SEGMENT_SECONDS = 600
+        # Network-bound (yt-dlp) and API-bound (Whisper) stages get separate bounded pools
+        self.DOWNLOAD_WORKERS = 4
+        self.TRANSCRIBE_WORKERS = 3
+        self.playlist_progress = {}
     def load_models(self):
         if self.embeddings is None:
             self.embeddings = OpenAIEmbeddings()
@@ -39,10 +69,45 @@ class YouTubeProcessor:
                 return match.group(1)
         raise ValueError("Invalid YouTube URL")
 
-    def download_audio(self, youtube_url):
+    def is_collection_url(self, url) -> bool:
+        """True for playlist and channel URLs (a watch URL with &list= is still a single video)"""
+        return bool(COLLECTION_URL_PATTERN.search(url))
+
+    def extract_playlist_entries(self, url):
+        """Enumerate the videos of a playlist or channel with yt-dlp, without downloading them"""
+        if re.search(r'youtube\.com\/(?:channel\/|c\/|user\/|@)[^\/?#]+\/?$', url):
+            # A bare channel URL lists its tabs; the uploads live under /videos
+            url = url.rstrip('/') + '/videos'
+        ydl_opts = {'extract_flat': 'in_playlist', 'quiet': True, 'skip_download': True}
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+
+        entries = []
+        pending = list(info.get('entries') or [])
+        while pending:
+            entry = pending.pop(0)
+            if not entry:
+                continue
+            if entry.get('entries'):
+                pending = list(entry['entries']) + pending
+                continue
+            video_id = entry.get('id')
+            if video_id and entry.get('ie_key', 'Youtube') == 'Youtube':
+                entries.append({
+                    "video_id": video_id,
+                    "title": entry.get('title') or video_id,
+                    "url": f"https://www.youtube.com/watch?v={video_id}",
+                })
+        return {
+            "playlist_id": info.get('id') or re.sub(r'\W+', '_', url),
+            "title": info.get('title') or url,
+            "entries": entries,
+        }
+
+    def download_audio(self, youtube_url, output_dir: str = "."):
         video_id = self.extract_video_id(youtube_url)
-        permanent_path = f"temp_audio_{video_id}.mp3"
-        output_template = f"temp_audio_{video_id}"
+        permanent_path = os.path.join(output_dir, f"temp_audio_{video_id}.mp3")
+        output_template = os.path.join(output_dir, f"temp_audio_{video_id}")
         ydl_opts = {
             'format': 'bestaudio/best',
             'outtmpl': output_template + '.%(ext)s',
@@ -59,8 +124,7 @@ class YouTubeProcessor:
             if os.path.exists(permanent_path):
                 return permanent_path
             else:
-                import glob
-                matching_files = glob.glob(f"temp_audio_{video_id}.*")
+                matching_files = glob.glob(f"{output_template}.*")
                 if matching_files:
                     os.rename(matching_files[0], permanent_path)
                     return permanent_path
@@ -68,20 +132,35 @@ class YouTubeProcessor:
                     raise FileNotFoundError(f"Downloaded audio file not found for video {video_id}")
 
         except Exception as e:
-            import glob
-            for file in glob.glob(f"temp_audio_{video_id}*"):
+            # Only the partial download is removed; finished checkpoints elsewhere are kept
+            for file in glob.glob(f"{output_template}*"):
                 try:
                     os.remove(file)
                 except:
                     pass
             raise e
 
+    def split_audio(self, audio_path, output_dir, segment_seconds: int = None):
+        """Cut audio into fixed-length segments with ffmpeg so each can be transcribed and checkpointed on its own"""
+        segment_seconds = segment_seconds or self.SEGMENT_SECONDS
+        pattern = os.path.join(output_dir, "segment_%03d.mp3")
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-i", audio_path, "-f", "segment",
+                 "-segment_time", str(segment_seconds), "-c", "copy", pattern],
+                check=True,
+            )
+        except (OSError, subprocess.CalledProcessError):
+            # Without ffmpeg the whole file is a single segment
+            return [audio_path]
+        return sorted(glob.glob(os.path.join(output_dir, "segment_*.mp3")))
+
     def transcribe_audio(self, audio_path):
-        audio_file = open(audio_path, "rb")
-        transcription = openai.audio.transcriptions.create(model=self.AUDIO_MODEL, file=audio_file, response_format="text")
+        with open(audio_path, "rb") as audio_file:
+            transcription = openai.audio.transcriptions.create(model=self.AUDIO_MODEL, file=audio_file, response_format="text")
         return transcription
 
-    def create_vector_store(self, text, progress_callback=None):
+    def create_vector_store(self, text, progress_callback=None, checkpoints=None):
         if progress_callback:
             progress_callback(0.7, "Creating vector embeddings...")
 
@@ -94,25 +173,35 @@ class YouTubeProcessor:
 
         chunks = text_splitter.split_text(text)
         documents = [Document(page_content=chunk) for chunk in chunks]
-        self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        if checkpoints is not None:
+            self.vector_store = faiss_from_documents_with_checkpoints(documents, self.embeddings, checkpoints)
+        else:
+            self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.knowledge_pack = None
         self.setup_conversation_chain()
 
         return self.vector_store
 
-    def setup_conversation_chain(self):
-        if self.vector_store is not None:
-            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
-            self.memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
+    def setup_conversation_chain(self, retriever=None):
+        if retriever is None and self.vector_store is not None:
             retriever = self.vector_store.as_retriever()
-            self.conversation_chain = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=retriever,
-                memory=self.memory
-            )
+        if retriever is not None:
+            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
+            self.memory = RollingSummaryMemory(llm=llm, memory_id="video", memory_key='chat_history', return_messages=True)
+            if self.CHAT_MODE == "fast":
+                self.conversation_chain = FastRetrievalChat(llm, retriever, self.memory)
+            else:
+                self.conversation_chain = ConversationalRetrievalChain.from_llm(
+                    llm=llm,
+                    retriever=retriever,
+                    memory=self.memory
+                )
 
     def generate_summary(self, text: str):
         client = openai.OpenAI()
-        response = client.chat.completions.create(
+        return cached_chat_completion(
+            client.chat.completions.create,
+            template_version=self.SUMMARY_TEMPLATE_VERSION,
             model="gpt-4.1-mini",
             messages=[
                     {
@@ -143,7 +232,6 @@ class YouTubeProcessor:
             max_tokens=300,
             temperature=0.7
             )
-        return response.choices[0].message.content
 
     def chat_with_video(self, question: str):
         if self.conversation_chain is None:
@@ -158,16 +246,234 @@ class YouTubeProcessor:
             return "Conversation history cleared!"
         return "No conversation to reset."
 
+    def prepare_segments(self, youtube_url, checkpoints):
+        """Download and split a video's audio once; returns the segment paths saved in checkpoints"""
+        segments = checkpoints.load_json("segments.json")
+        if segments is not None and all(os.path.exists(path) for path in segments):
+            return segments
+        audio_path = checkpoints.load_json("audio.json")
+        if audio_path is None or not os.path.exists(audio_path):
+            audio_path = self.download_audio(youtube_url, output_dir=checkpoints.directory)
+            checkpoints.save_json("audio.json", audio_path)
+        segments = self.split_audio(audio_path, checkpoints.directory)
+        checkpoints.save_json("segments.json", segments)
+        if audio_path not in segments and os.path.exists(audio_path):
+            os.remove(audio_path)
+        return segments
+
+    def transcribe_segments(self, segments, checkpoints):
+        """Transcribe each segment, reusing the segment transcripts already saved in checkpoints"""
+        texts = []
+        for index, segment_path in enumerate(segments):
+            name = f"segment_{index:03d}.txt"
+            text = checkpoints.load_text(name)
+            if text is None:
+                text = self.transcribe_audio(segment_path)
+                checkpoints.save_text(name, text)
+            texts.append(text.strip())
+        return "\n".join(texts)
+
+    def transcribe_with_checkpoints(self, youtube_url, checkpoints):
+        """Download, split and transcribe a video, reusing every stage already saved in checkpoints"""
+        transcript = checkpoints.load_text("transcript.txt")
+        if transcript is not None:
+            return transcript
+        transcript = self.transcribe_segments(self.prepare_segments(youtube_url, checkpoints), checkpoints)
+        checkpoints.save_text("transcript.txt", transcript)
+        return transcript
+
     def process_video(self, youtube_url: str):
+      """
+      Transcribe, index and summarize a video. Each finished stage is checkpointed
+      under the video's fingerprint, so a retry resumes where the last attempt failed.
+      """
       video_id = self.extract_video_id(youtube_url)
-      audio_path = self.download_audio(youtube_url)
-      transcript = self.transcribe_audio(audio_path)
-      self.create_vector_store(transcript)
+      gc_checkpoints()
+      checkpoints = CheckpointStore(video_fingerprint(video_id))
+      transcript = self.transcribe_with_checkpoints(youtube_url, checkpoints)
+      self.create_vector_store(transcript, checkpoints=checkpoints)
       summary = self.generate_summary(transcript)
-      if os.path.exists(audio_path):
-        os.remove(audio_path)
+      checkpoints.complete()
+      self.video_id, self.transcript, self.summary = video_id, transcript, summary
+      return {
+          "video_id": video_id,
+          "transcript": transcript,
+          "summary": summary
+      }
+
+    def export_knowledge_pack(self, path: str):
+        """Write the processed video's index, transcript and summary to one knowledge pack file"""
+        if self.vector_store is None:
+            raise ValueError("No video processed yet. Please process a video first.")
+        vectors, chunks, metadata = faiss_contents(self.vector_store)
+        info = {"kind": "video", "video_id": self.video_id, "embedding_model": getattr(self.embeddings, "model", None)}
+        return write_knowledge_pack(path, vectors, chunks, metadata, summary=self.summary, text=self.transcript, info=info)
+
+    def load_knowledge_pack(self, path: str):
+        """Memory-map a knowledge pack and chat with it without rebuilding the index"""
+        self.load_models()
+        self.knowledge_pack = KnowledgePack(path)
+        self.vector_store = None
+        self.video_id = self.knowledge_pack.info.get("video_id")
+        self.transcript, self.summary = self.knowledge_pack.text, self.knowledge_pack.summary
+        self.setup_conversation_chain(KnowledgePackRetriever(pack=self.knowledge_pack, embeddings=self.embeddings))
+        return self.knowledge_pack
+
+    def process_playlist(self, playlist_url: str, progress_callback=None, state_dir: str = PLAYLIST_STATE_DIR):
+        """
+        Download and transcribe every video of a playlist or channel into one index.
+        Finished transcripts are kept under state_dir, so a rerun after a failure
+        only processes the videos that are still missing.
+        """
+        playlist = self.extract_playlist_entries(playlist_url)
+        entries = playlist["entries"]
+        if not entries:
+            raise ValueError("No videos found in this playlist")
+
+        playlist_dir = os.path.join(state_dir, re.sub(r'[^\w-]', '_', playlist["playlist_id"]))
+        os.makedirs(playlist_dir, exist_ok=True)
+        state_path = os.path.join(playlist_dir, "state.json")
+        state = {"videos": {}}
+        if os.path.exists(state_path):
+            with open(state_path, "r", encoding="utf-8") as file:
+                state = json.load(file)
+        state_lock = threading.Lock()
+
+        def transcript_path(video_id):
+            return os.path.join(playlist_dir, f"{video_id}.txt")
+
+        def update(video_id, status):
+            with state_lock:
+                self.playlist_progress[video_id] = status
+                state["videos"].setdefault(video_id, {})["status"] = status
+                tmp_path = state_path + ".tmp"
+                with open(tmp_path, "w", encoding="utf-8") as file:
+                    json.dump(state, file)
+                os.replace(tmp_path, state_path)
+
+        def report():
+            # Called from this thread only; UI callbacks are not safe from pool threads
+            if progress_callback:
+                done = sum(1 for status in self.playlist_progress.values() if status == "done")
+                progress_callback(0.7 * done / len(entries), f"{done}/{len(entries)} videos transcribed")
+
+        self.playlist_progress = {}
+        pending = []
+        for entry in entries:
+            video_id = entry["video_id"]
+            if state["videos"].get(video_id, {}).get("status") == "done" and os.path.exists(transcript_path(video_id)):
+                self.playlist_progress[video_id] = "done"
+            else:
+                self.playlist_progress[video_id] = "queued"
+                pending.append(entry)
+        report()
+
+        # Downloads wait for a slot so finished-but-untranscribed audio never piles up on disk
+        # faster than Whisper can consume it; a slot is freed once the video is transcribed or fails
+        audio_slots = threading.BoundedSemaphore(self.TRANSCRIBE_WORKERS * 2)
+
+        def download(entry):
+            audio_slots.acquire()
+            try:
+                update(entry["video_id"], "downloading")
+                # Same checkpoints as process_video: a video already split elsewhere is not downloaded again
+                checkpoints = CheckpointStore(video_fingerprint(entry["video_id"]))
+                return checkpoints, self.prepare_segments(entry["url"], checkpoints)
+            except BaseException:
+                audio_slots.release()
+                raise
+
+        def transcribe(entry, checkpoints, segments):
+            try:
+                update(entry["video_id"], "transcribing")
+                # Segmented like single videos, so long lectures stay under Whisper's upload limit
+                transcript = self.transcribe_segments(segments, checkpoints)
+                with open(transcript_path(entry["video_id"]), "w", encoding="utf-8") as file:
+                    file.write(transcript)
+                checkpoints.complete()
+                update(entry["video_id"], "done")
+            finally:
+                audio_slots.release()
+
+        gc_checkpoints()
+        with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as download_pool, \
+             ThreadPoolExecutor(max_workers=self.TRANSCRIBE_WORKERS) as transcribe_pool:
+            downloads = {}
+            for entry in pending:
+                downloads[download_pool.submit(download, entry)] = entry
+            transcriptions = {}
+            for future in as_completed(downloads):
+                entry = downloads[future]
+                try:
+                    transcriptions[transcribe_pool.submit(transcribe, entry, *future.result())] = entry
+                except Exception as e:
+                    update(entry["video_id"], f"failed: {e}")
+                report()
+            for future in as_completed(transcriptions):
+                entry = transcriptions[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    update(entry["video_id"], f"failed: {e}")
+                report()
+
+        completed = []
+        for entry in entries:
+            if self.playlist_progress.get(entry["video_id"]) == "done":
+                with open(transcript_path(entry["video_id"]), "r", encoding="utf-8") as file:
+                    completed.append((entry, file.read()))
+        if not completed:
+            raise RuntimeError("No video in the playlist could be transcribed")
+
+        if progress_callback:
+            progress_callback(0.7, "Creating vector embeddings...")
+        self.load_models()
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=500,
+            chunk_overlap=100,
+            length_function=len,
+        )
+        documents = []
+        for entry, transcript in completed:
+            for index, chunk in enumerate(text_splitter.split_text(transcript)):
+                metadata = {"video_id": entry["video_id"], "title": entry["title"], "url": entry["url"], "chunk": index}
+                documents.append(Document(page_content=chunk, metadata=metadata))
+        self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.knowledge_pack = None
+        self.setup_conversation_chain()
+
+        if progress_callback:
+            progress_callback(0.9, "Generating summary...")
+        # Give every lecture a share of the summary prompt instead of only the first one
+        budget = max(200, 4000 // len(completed))
+        overview = "\n\n".join(f"{entry['title']}:\n{transcript[:budget]}" for entry, transcript in completed)
+        summary = self.generate_summary(overview)
+        combined = "\n\n".join(f"===== {entry['title']} ({entry['video_id']}) =====\n{transcript}" for entry, transcript in completed)
+
+        self.video_id, self.transcript, self.summary = playlist["playlist_id"], combined, summary
+        if progress_callback:
+            progress_callback(1.0, "Done")
         return {
-            "video_id": video_id,
-            "transcript": transcript,
+            "playlist_id": playlist["playlist_id"],
+            "title": playlist["title"],
+            "videos": [dict(entry, status=self.playlist_progress.get(entry["video_id"])) for entry in entries],
+            "transcript": combined,
             "summary": summary
-        }
\ No newline at end of file
+        }
+
+    def batch_search(self, queries, k: int = 4, fetch_k: int = 20, mmr: bool = False, lambda_mult: float = 0.5,
+                     return_documents: bool = False):
+        """
+        Search the processed video for many queries at once: one embedding call and one
+        matrix index search, with optional MMR re-ranking of the top fetch_k hits.
+        Returns one list of chunk texts (or Documents) per query.
+        """
+        store = self.vector_store if self.vector_store is not None else self.knowledge_pack
+        if store is None:
+            raise ValueError("No video processed yet. Please process a video first.")
+        self.load_models()
+        results = vector_search.batch_search(store, self.embeddings, queries, k=k, fetch_k=fetch_k,
+                                             mmr=mmr, lambda_mult=lambda_mult)
+        if return_documents:
+            return results
+        return [[doc.page_content for doc in docs] for docs in results]
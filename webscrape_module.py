@@ -7,12 +7,19 @@ from langchain.vectorstores import FAISS
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document
 from langchain_openai import ChatOpenAI
-from langchain.memory import ConversationBufferMemory
 from langchain.chains import ConversationalRetrievalChain
+from memory_module import RollingSummaryMemory
+from chat_module import FastRetrievalChat
+from knowledge_pack import KnowledgePack, KnowledgePackRetriever, faiss_contents, write_knowledge_pack
+from llm_cache import cached_chat_completion
+import vector_search
 
 load_dotenv()
 openai.api_key = os.getenv("OPENAI_API_KEY")
 
+# Summary text returned when the summary call fails; results carrying it are not final
+SUMMARY_ERROR_PREFIX = "Error generating website summary"
+
 
 class WebsiteProcess:
     def __init__(self):
@@ -20,20 +27,29 @@ class WebsiteProcess:
       self.vector_store = None
       self.conversation_chain = None
       self.memory = None
+      self.knowledge_pack = None
+      self.url = None
+      self.processed_document_text = None
+      self.summary = None
       self.MODEL = "gpt-4o-mini"
+      self.CHAT_MODE = "fast"
+      # Drop nav/header/footer chrome from scraped pages before indexing
+      self.STRIP_BOILERPLATE = True
+      self.SUMMARY_TEMPLATE_VERSION = "website-summary-v1"
 
     def load_models(self):
       if self.embeddings is None:
         self.embeddings = OpenAIEmbeddings()
 
     def get_all_details(self, url):
+      landing_page = Website(url, strip_boilerplate=self.STRIP_BOILERPLATE)
       result = "Landing page:\n"
-      result += Website(url).get_contents()
-      links = get_links(url)
+      result += landing_page.get_contents()
+      links = get_links(url, website=landing_page)
       print("Found links:", links)
       for link in links["links"]:
         result += f"\n\n{link['type']}\n"
-        result += Website(link["url"]).get_contents()
+        result += Website(link["url"], strip_boilerplate=self.STRIP_BOILERPLATE).get_contents()
       return result
 
     def create_website_vector_store(self, text: str):
@@ -49,28 +65,35 @@ class WebsiteProcess:
         documents = [Document(page_content=chunk) for chunk in chunks]
 
         self.vector_store = FAISS.from_documents(documents, self.embeddings)
+        self.knowledge_pack = None
 
         self.setup_website_conversation_chain()
 
         return self.vector_store
 
-    def setup_website_conversation_chain(self):
+    def setup_website_conversation_chain(self, retriever=None):
         """Setup the conversational retrieval chain for documents"""
-        if self.vector_store is not None:
-            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
-            self.memory = ConversationBufferMemory(memory_key='chat_history', return_messages=True)
+        if retriever is None and self.vector_store is not None:
             retriever = self.vector_store.as_retriever()
-            self.conversation_chain = ConversationalRetrievalChain.from_llm(
-                llm=llm,
-                retriever=retriever,
-                memory=self.memory
-            )
+        if retriever is not None:
+            llm = ChatOpenAI(temperature=0.7, model_name=self.MODEL)
+            self.memory = RollingSummaryMemory(llm=llm, memory_id="website", memory_key='chat_history', return_messages=True)
+            if self.CHAT_MODE == "fast":
+                self.conversation_chain = FastRetrievalChat(llm, retriever, self.memory)
+            else:
+                self.conversation_chain = ConversationalRetrievalChain.from_llm(
+                    llm=llm,
+                    retriever=retriever,
+                    memory=self.memory
+                )
 
     def generate_website_summary(self, text: str):
         """Generate summary for document using OpenAI GPT"""
         try:
             client = openai.OpenAI()
-            response = client.chat.completions.create(
+            return cached_chat_completion(
+                client.chat.completions.create,
+                template_version=self.SUMMARY_TEMPLATE_VERSION,
                 model=self.MODEL,
                 messages=[
                     {
@@ -101,9 +124,8 @@ class WebsiteProcess:
                 max_tokens=300,
                 temperature=0.3
             )
-            return response.choices[0].message.content
         except Exception as e:
-            return f"Error generating website summary: {str(e)}"
+            return f"{SUMMARY_ERROR_PREFIX}: {str(e)}"
 
     def chat_with_website_content(self, question: str):
         """Chat with the Website content using conversational retrieval"""
@@ -130,7 +152,45 @@ class WebsiteProcess:
             self.processed_document_text = text
             self.create_website_vector_store(text)
             summary = self.generate_website_summary(text)
+            self.url, self.summary = url, summary
+            if summary.startswith(SUMMARY_ERROR_PREFIX):
+                return text, summary, f"Website processed with errors: {summary}"
             return text, summary, "Website processed successfully!"
 
         except Exception as e:
             return "", "", f"Error processing website: {str(e)}"
+
+    def export_knowledge_pack(self, path: str):
+        """Write the processed website's index, text and summary to one knowledge pack file"""
+        if self.vector_store is None:
+            raise ValueError("No Website content processed yet. Please process a url first.")
+        vectors, chunks, metadata = faiss_contents(self.vector_store)
+        info = {"kind": "website", "url": self.url, "embedding_model": getattr(self.embeddings, "model", None)}
+        return write_knowledge_pack(path, vectors, chunks, metadata, summary=self.summary, text=self.processed_document_text, info=info)
+
+    def load_knowledge_pack(self, path: str):
+        """Memory-map a knowledge pack and chat with it without rebuilding the index"""
+        self.load_models()
+        self.knowledge_pack = KnowledgePack(path)
+        self.vector_store = None
+        self.url = self.knowledge_pack.info.get("url")
+        self.processed_document_text, self.summary = self.knowledge_pack.text, self.knowledge_pack.summary
+        self.setup_website_conversation_chain(KnowledgePackRetriever(pack=self.knowledge_pack, embeddings=self.embeddings))
+        return self.knowledge_pack
+
+    def batch_search(self, queries, k: int = 4, fetch_k: int = 20, mmr: bool = False, lambda_mult: float = 0.5,
+                     return_documents: bool = False):
+        """
+        Search the processed website for many queries at once: one embedding call and one
+        matrix index search, with optional MMR re-ranking of the top fetch_k hits.
+        Returns one list of chunk texts (or Documents) per query.
+        """
+        store = self.vector_store if self.vector_store is not None else self.knowledge_pack
+        if store is None:
+            raise ValueError("No Website content processed yet. Please process a url first.")
+        self.load_models()
+        results = vector_search.batch_search(store, self.embeddings, queries, k=k, fetch_k=fetch_k,
+                                             mmr=mmr, lambda_mult=lambda_mult)
+        if return_documents:
+            return results
+        return [[doc.page_content for doc in docs] for docs in results]
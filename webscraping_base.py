@@ -3,7 +3,9 @@ import requests
 import json
 from typing import List
 from dotenv import load_dotenv
-from bs4 import BeautifulSoup
+from html_extract import extract
+from llm_cache import cached_chat_completion
+from link_ranker import CONFIDENCE_THRESHOLD, LinkDecisionCache, candidate_links, rank_links
 from IPython.display import Markdown, display, update_display
 from openai import OpenAI
 
@@ -12,6 +14,8 @@ load_dotenv(override=True)
 os.getenv('OPENAI_API_KEY')
 
 MODEL = 'gpt-4o-mini'
+# Bump when link_system_prompt or get_links_user_prompt changes
+LINK_TEMPLATE_VERSION = 'links-v1'
 openai = OpenAI()
 
 
@@ -24,20 +28,18 @@ class Website:
     A utility class to represent a Website that we have scraped, now with links
     """
 
-    def __init__(self, url):
+    def __init__(self, url, engine=None, strip_boilerplate=False):
         self.url = url
         response = requests.get(url, headers=headers)
         self.body = response.content
-        soup = BeautifulSoup(self.body, 'html.parser')
-        self.title = soup.title.string if soup.title else "No title found"
-        if soup.body:
-            for irrelevant in soup.body(["script", "style", "img", "input"]):
-                irrelevant.decompose()
-            self.text = soup.body.get_text(separator="\n", strip=True)
-        else:
-            self.text = ""
-        links = [link.get('href') for link in soup.find_all('a')]
-        self.links = [link for link in links if link]
+        # requests reports ISO-8859-1 for any text/* response without a charset; only trust an explicit one
+        header_charset = "charset" in response.headers.get("content-type", "").lower()
+        encoding = response.encoding if header_charset else None
+        extraction = extract(self.body, engine=engine, strip_boilerplate=strip_boilerplate, encoding=encoding)
+        self.title = extraction.title
+        self.text = extraction.text
+        self.links = extraction.links
+        self.anchors = extraction.anchors
 
     def get_contents(self):
         return f"Webpage Title:\n{self.title}\nWebpage Contents:\n{self.text}\n\n"
@@ -55,23 +57,44 @@ link_system_prompt += """
     ]
 }
 """
-def get_links_user_prompt(website):
+# Upper bound on links sent to the LLM fallback, so the prompt size stays bounded
+MAX_PROMPT_LINKS = 150
+link_cache = LinkDecisionCache()
+
+def get_links_user_prompt(website, links=None):
+    links = website.links if links is None else links
     user_prompt = f"Here is the list of links on the website of {website.url} - "
     user_prompt += "please decide which of these are relevant web links for a brochure about the company, respond with the full https URL in JSON format. \
 Do not include Terms of Service, Privacy, email links.\n"
     user_prompt += "Links (some might be relative links):\n"
-    user_prompt += "\n".join(website.links)
+    user_prompt += "\n".join(links[:MAX_PROMPT_LINKS])
     return user_prompt
 
-def get_links(url):
-    website = Website(url)
-    response = openai.chat.completions.create(
+def select_links_with_llm(website, links=None):
+    result = cached_chat_completion(
+        openai.chat.completions.create,
+        template_version=LINK_TEMPLATE_VERSION,
         model=MODEL,
         messages=[
             {"role": "system", "content": link_system_prompt},
-            {"role": "user", "content": get_links_user_prompt(website)}
+            {"role": "user", "content": get_links_user_prompt(website, links)}
       ],
         response_format={"type": "json_object"}
     )
-    result = response.choices[0].message.content
     return json.loads(result)
+
+def get_links(url, website=None):
+    """
+    Pick the brochure-relevant links of a landing page. Links are ranked locally
+    and the LLM is only asked when the ranking is unsure; decisions are cached per domain.
+    """
+    cached = link_cache.get(url)
+    if cached is not None:
+        return cached
+    website = website or Website(url)
+    candidates = candidate_links(website.url, website.anchors)
+    result, confidence = rank_links(candidates)
+    if confidence < CONFIDENCE_THRESHOLD and candidates:
+        result = select_links_with_llm(website, [link for link, _ in candidates])
+    link_cache.set(url, result)
+    return result